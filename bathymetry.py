@@ -0,0 +1,276 @@
+"""Профили глубины дна для волнового решателя.
+
+Модуль не зависит от matplotlib и tkinter, поэтому его можно использовать
+как из интерфейса (m2.py, test.py), так и из пакетных расчётов. Кроме
+формул из depth_profile дно можно загрузить из файла (load_grid).
+"""
+import hashlib
+import json
+import math
+import os
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+
+PROFILES = ("Гора", "Впадина", "Хребет", "Плато", "Случайный", "Многослойный")
+FILE_PROFILE = "Из файла"  # Дно из файла .npy или .asc (см. load_grid)
+
+
+def make_grid(L, dx):
+    """Координаты узлов квадратной области размера L с шагом dx."""
+    nx = int(L / dx)
+    x = np.linspace(0, L, nx)
+    y = np.linspace(0, L, nx)
+    return x, y
+
+
+def depth_profile(x, y, profile_type, L, D0, hill_height, hill_width, hill_x, hill_y, seed=None):
+    """Глубина дна в точках (x, y) для выбранного типа профиля.
+
+    seed — зерно генератора для профиля "Случайный".
+    """
+    if profile_type == "Гора":
+        return D0 - hill_height * np.exp(-((x - hill_x) ** 2 + (y - hill_y) ** 2) / (2 * hill_width ** 2))
+    elif profile_type == "Впадина":
+        return D0 + hill_height * np.exp(-((x - hill_x) ** 2 + (y - hill_y) ** 2) / (2 * hill_width ** 2))
+    elif profile_type == "Хребет":
+        return D0 - hill_height * np.exp(-(x - hill_x) ** 2 / (2 * hill_width ** 2))
+    elif profile_type == "Плато":
+        return D0 - hill_height * (x / L)
+    elif profile_type == "Случайный":
+        return D0 - hill_height * np.random.default_rng(seed).random(x.shape)
+    elif profile_type == "Многослойный":
+        layer_width = L / 4  # Ширина одного слоя
+        return D0 - hill_height * (np.floor(x / layer_width) % 2)
+    else:
+        raise ValueError("Неизвестный тип профиля!")
+
+
+def _read_asc_header(f):
+    """Заголовок ESRI ASCII grid: словарь ключей в нижнем регистре."""
+    header = {}
+    while True:
+        position = f.tell()
+        line = f.readline()
+        parts = line.split()
+        if not parts or not parts[0][0].isalpha():
+            f.seek(position)
+            return header
+        header[parts[0].lower()] = float(parts[1])
+
+
+def _block_mean(rows, factor):
+    """Среднее по блокам factor x factor; блоки без данных (только NaN) дают NaN."""
+    ny, nx = rows.shape[0] // factor, rows.shape[1] // factor
+    blocks = rows[:ny * factor, :nx * factor].reshape(ny, factor, nx, factor)
+    valid = np.isfinite(blocks)
+    total = np.where(valid, blocks, 0).sum(axis=(1, 3))
+    count = valid.sum(axis=(1, 3))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total / count, np.nan)
+
+
+def _read_asc_rows(f, header, r0, r1, c0, c1, factor):
+    """Строки r0..r1-1 и столбцы c0..c1-1 файла .asc, усреднённые блоками по мере чтения.
+
+    Строки вне окна пропускаются без разбора, в памяти одновременно не больше
+    factor строк исходной сетки.
+    """
+    nodata = header.get("nodata_value")
+    out, band = [], []
+    for r, line in enumerate(f):
+        if r >= r1:
+            break
+        if r < r0:
+            continue
+        row = np.array(line.split()[c0:c1], dtype=float)
+        if nodata is not None:
+            row[row == nodata] = np.nan
+        band.append(row)
+        if len(band) == factor:
+            out.append(_block_mean(np.array(band), factor)[0])
+            band = []
+    return np.array(out)
+
+
+def load_grid(path, dx=None, window=None, cellsize=None, elevation=None, max_size=None):
+    """Загрузить дно из .npy (отображается в память) или ESRI ASCII grid (.asc).
+
+    window — окно (r0, r1, c0, c1) в ячейках исходной сетки; читается только оно.
+    dx — шаг сетки решателя: ячейки усредняются блоками round(dx / cellsize)
+    x round(dx / cellsize); max_size — наибольшее число узлов по стороне
+    (вместе с dx — верхний предел: блоки укрупняются, пока сетка больше).
+    cellsize — размер ячейки исходной сетки (для .asc берётся из заголовка,
+    для .npy по умолчанию 1). Окно должно лежать внутри сетки и давать хотя
+    бы два узла по стороне, иначе ValueError. elevation=True — в файле высоты
+    рельефа (под водой отрицательные, как в GEBCO), False — глубины; по
+    умолчанию True для .asc и False для .npy.
+
+    Возвращает x, y и глубины D формы (len(y), len(x)); строки идут с юга на
+    север, как у make_grid. Суша получает отрицательную глубину, ячейки без
+    данных — NaN.
+    """
+    is_asc = path.lower().endswith(".asc")
+    if elevation is None:
+        elevation = is_asc
+
+    if is_asc:
+        with open(path, encoding="ascii") as f:
+            header = _read_asc_header(f)
+            shape = int(header["nrows"]), int(header["ncols"])
+            cellsize = cellsize or header["cellsize"]
+            r0, r1, c0, c1, factor = _window(window, shape, cellsize, dx, max_size)
+            D = _read_asc_rows(f, header, r0, r1, c0, c1, factor)
+        # Файл .asc начинается с северной строки
+        D = D[::-1]
+    else:
+        grid = np.load(path, mmap_mode="r")
+        cellsize = cellsize or 1.0
+        r0, r1, c0, c1, factor = _window(window, grid.shape, cellsize, dx, max_size)
+        # Полосами по factor строк, чтобы не читать окно в память целиком
+        band = factor * max(1, 2 ** 22 // max(1, (c1 - c0) * factor))
+        D = np.concatenate([_block_mean(np.asarray(grid[r:min(r + band, r1), c0:c1], dtype=float), factor)
+                            for r in range(r0, r1 - factor + 1, band)])
+
+    if elevation:
+        D = -D
+    step = factor * cellsize
+    x = np.arange(D.shape[1]) * step
+    y = np.arange(D.shape[0]) * step
+    return x, y, D
+
+
+def grid_extent(path, dx=None, window=None, cellsize=None, max_size=None):
+    """Размеры (Lx, Ly) области, которую вернёт load_grid, без чтения данных."""
+    if path.lower().endswith(".asc"):
+        with open(path, encoding="ascii") as f:
+            header = _read_asc_header(f)
+        shape = int(header["nrows"]), int(header["ncols"])
+        cellsize = cellsize or header["cellsize"]
+    else:
+        shape = np.load(path, mmap_mode="r").shape
+        cellsize = cellsize or 1.0
+    r0, r1, c0, c1, factor = _window(window, shape, cellsize, dx, max_size)
+    step = factor * cellsize
+    return float(((c1 - c0) // factor - 1) * step), float(((r1 - r0) // factor - 1) * step)
+
+
+def _window(window, shape, cellsize, dx, max_size):
+    """Проверенное окно (r0, r1, c0, c1) сетки формы shape и множитель укрупнения."""
+    r0, r1, c0, c1 = (int(v) for v in window) if window is not None else (0, shape[0], 0, shape[1])
+    if not (0 <= r0 < r1 <= shape[0] and 0 <= c0 < c1 <= shape[1]):
+        raise ValueError(f"Окно {r0},{r1},{c0},{c1} пусто или выходит за сетку файла "
+                         f"{shape[0]} x {shape[1]} ячеек!")
+    factor = _resample_factor(r1 - r0, c1 - c0, cellsize, dx, max_size)
+    # Шаг сетки решателя задают хотя бы два узла по каждой оси
+    if (r1 - r0) // factor < 2 or (c1 - c0) // factor < 2:
+        raise ValueError(f"Окно {r1 - r0} x {c1 - c0} ячеек даёт меньше двух узлов по стороне "
+                         f"при укрупнении в {factor} раз: увеличьте окно или уменьшите dx!")
+    return r0, r1, c0, c1, factor
+
+
+def _resample_factor(rows, cols, cellsize, dx, max_size):
+    """Во сколько раз укрупнить ячейки исходной сетки."""
+    factor = 1
+    if dx is not None:
+        factor = max(factor, int(round(dx / cellsize)))
+    if max_size is not None:
+        factor = max(factor, math.ceil(max(rows, cols) / max_size))
+    return factor
+
+
+class SeabedCache:
+    """LRU-кэш полей дна (D, c, коэффициент схемы) в памяти и на диске.
+
+    Ключ — хэш словаря параметров, от которых зависят поля. На диске каждый
+    набор полей лежит в <directory>/<ключ>.npz; directory=None отключает диск.
+    max_bytes ограничивает размер папки: после записи удаляются файлы, к
+    которым дольше всего не обращались (None — без ограничения).
+    """
+
+    def __init__(self, maxsize=4, directory=None, max_bytes=None):
+        self.maxsize = maxsize
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+
+    @staticmethod
+    def key(params):
+        text = json.dumps(params, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def get(self, params, build):
+        """Поля для params; build() вызывается, только если их нет в кэше."""
+        key = self.key(params)
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+
+        path = os.path.join(self.directory, key + ".npz") if self.directory else None
+        if path and os.path.exists(path):
+            with np.load(path) as data:
+                fields = dict(data)
+            os.utime(path)  # Время обращения для вытеснения старых файлов
+        else:
+            fields = build()
+            if path:
+                self._save(path, fields)
+
+        self._memory[key] = fields
+        if len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+        return fields
+
+    def clear(self):
+        self._memory.clear()
+
+    def _save(self, path, fields):
+        os.makedirs(self.directory, exist_ok=True)
+        # Одно и то же дно могут строить сразу несколько процессов (sweep.py),
+        # поэтому временный файл у каждой записи свой
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **fields)
+            if os.path.exists(path):
+                os.remove(tmp)  # Другой процесс уже записал те же поля
+            else:
+                os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self._trim()
+
+    def _trim(self):
+        """Удалить давно не использованные файлы, пока папка больше max_bytes."""
+        if self.max_bytes is None:
+            return
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npz"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:  # Удалён другим процессом
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        # Самый свежий файл остаётся, даже если он один больше предела
+        for _, size, path in files[:-1]:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+# Общий кэш процесса. Папку на диске задаёт переменная TSUNAMI_CACHE (пустое
+# значение отключает диск), предел её размера в МБ — TSUNAMI_CACHE_MB
+default_cache = SeabedCache(directory=os.environ.get(
+    "TSUNAMI_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "tsunami")) or None,
+    max_bytes=float(os.environ.get("TSUNAMI_CACHE_MB", 1024)) * 2 ** 20)
@@ -0,0 +1,417 @@
+"""Замеры производительности: шаг схемы, лучи, отрисовка и запись кадров.
+
+Результаты пишутся в JSON вместе с настройками прогона (--dtype, --order,
+--workers, --processes, --quick); с --baseline они сравниваются с
+сохранённым прогоном с теми же настройками, и при замедлении больше чем на
+--tolerance программа завершается с кодом 1.
+
+    python bench.py --out bench.json
+    python bench.py --quick --baseline bench.json --tolerance 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from rays import DEFAULT_SEABED, AnalyticSeabed, initial_fan, integrate_rays
+from solver import WaveSolver, build_solver, stable_dt, stamp_source
+
+STENCIL_SIZES = (60, 125, 250, 500, 1000, 2000, 4000)
+RAY_COUNTS = (50, 150, 500, 2000)
+QUICK_STENCIL_SIZES = (60, 250, 1000)
+QUICK_RAY_COUNTS = (150, 500)
+
+# Примерное число обновлений узлов на один замер шага схемы
+STENCIL_WORK = 2e7
+
+# Шаги сетки проверки сходимости (м) и число Куранта для каждого порядка
+CONVERGENCE_DX = (50, 25, 12.5)
+CONVERGENCE_COURANT = {2: 0.9, 4: 0.5}
+
+
+def _best_time(fn, repeat=3):
+    """Наименьшее время из repeat запусков fn()."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _result(value, unit, higher_is_better=True, **extra):
+    return {"value": value, "unit": unit, "higher_is_better": higher_is_better, **extra}
+
+
+def _make_solver(nx, workers=1, active_region=True, **params):
+    """Решатель m2.py на сетке nx x nx с источником в центре."""
+    dx = 5
+    L = nx * dx
+    source = {"x": L / 2, "y": L / 2, "height": 10, "width": 10 * dx, "delay": 0}
+    return build_solver(dict({"L": L, "dx": dx}, **params), [source], workers=workers, cache=None,
+                        active_region=active_region)
+
+
+def bench_stencil(sizes=STENCIL_SIZES, workers=1, dtype="float64", order=2):
+    """Шагов в секунду и миллионов узлов в секунду для каждого размера сетки.
+
+    Схема считается по всей сетке, без активной области, чтобы замер не
+    зависел от того, как далеко успела разойтись волна.
+    """
+    results = {}
+    for nx in sizes:
+        solver = _make_solver(nx, workers, active_region=False, dtype=dtype, order=order)
+        steps = int(max(3, min(500, STENCIL_WORK / nx ** 2)))
+        solver.step(2)  # Прогрев: потоки, кэши процессора
+        elapsed = _best_time(lambda: solver.step(steps))
+        solver.close()
+        results[f"stencil/nx={nx}"] = _result(steps / elapsed, "шаг/с", steps=steps)
+        results[f"stencil/nx={nx}/cells"] = _result(steps * nx * nx / elapsed / 1e6, "Музл/с")
+    return results
+
+
+def bench_active(nx=1000, steps=200):
+    """Шагов в секунду в начале расчёта, пока волна занимает часть сетки."""
+    def run():
+        solver = _make_solver(nx)
+        solver.step(steps)
+        return solver
+
+    elapsed = _best_time(run, repeat=2)
+    solver = run()
+    full = _make_solver(nx, active_region=False)
+    full.step(steps)
+    # Отличие от расчёта по всей сетке задаёт порог активной области
+    error = float(np.max(np.abs(solver.eta - full.eta)))
+    return {f"active/nx={nx}": _result(steps / elapsed, "шаг/с", steps=steps,
+                                       fraction=float(solver.active_fraction), error=error)}
+
+
+def bench_ensemble(nx=60, members=64, steps=200):
+    """Шаг*член в секунду для ансамбля и для тех же членов по одному."""
+    from ensemble import build_ensemble
+
+    dx = 5
+    source = {"x": nx * dx / 2, "y": nx * dx / 2, "height": 10, "width": 10 * dx, "delay": 0}
+    ensemble = build_ensemble({"L": nx * dx, "dx": dx}, [{"sources": [source]}] * members, cache=None)
+    elapsed = _best_time(lambda: ensemble.step(steps), repeat=2)
+    solver = _make_solver(nx, active_region=False)
+    single = _best_time(lambda: solver.step(steps), repeat=2)
+    return {
+        f"ensemble/m={members}/nx={nx}": _result(members * steps / elapsed, "шаг*член/с"),
+        f"ensemble/single/nx={nx}": _result(steps / single, "шаг*член/с"),
+    }
+
+
+def check_precision(nx=250, steps=400):
+    """Расхождение float32 с float64 на одном сценарии.
+
+    Ошибка берётся относительно наибольшего отклонения от уровня покоя в
+    расчёте float64. Возвращает замеры (меньше — лучше) и память слоёв eta.
+    """
+    states = {}
+    for dtype in ("float64", "float32"):
+        solver = _make_solver(nx, dtype=dtype)
+        solver.step(steps)
+        states[dtype] = solver.state.astype(np.float64)
+        memory = sum(a.nbytes for a in (solver.eta, solver.eta_prev, solver.eta_next, solver.c, solver.coef))
+        states[dtype + "/memory"] = memory
+    reference = states["float64"]
+    amplitude = np.max(np.abs(reference - solver.rest_level))
+    error = np.max(np.abs(states["float32"] - reference)) / amplitude
+    return {
+        f"precision/float32/nx={nx}": _result(error, "отн. ошибка", higher_is_better=False, steps=steps),
+        f"memory/float32/nx={nx}": _result(states["float32/memory"] / states["float64/memory"],
+                                            "доля float64", higher_is_better=False),
+    }
+
+
+def _pulse(dx, order, dt, size=2000, depth=20.0, width=100.0, t_end=30.0):
+    """Отклонение от покоя в момент t_end для гауссова импульса над ровным дном.
+
+    Узлы идут точно с шагом dx, а dt уменьшается так, чтобы шаги ровно
+    укладывались в t_end; за это время волна не доходит до краёв. Импульс
+    ставится с окном в десять ширин: обрезка на четырёх (как у источников
+    решателя) оставляет ступеньку exp(-8), и ошибка перестаёт убывать.
+    """
+    n = int(round(size / dx)) + 1
+    steps = int(np.ceil(t_end / dt))
+    solver = WaveSolver(dx=dx, dt=t_end / steps, rest_level=depth, order=order, active_region=False)
+    solver.init(np.full((n, n), depth), [])
+    stamp_source((solver.eta,), solver.x, solver.y, size / 2, size / 2, 1, width, reach=10,
+                 prev=solver.eta_prev, coef=solver.coef, dx=dx)
+    return solver.step(steps) - depth
+
+
+def _pulse_dt(dx, order, courant, depth=20.0):
+    return stable_dt(np.sqrt(9.81 * depth), dx, courant, order)
+
+
+def _rate(errors, dxs):
+    """Наблюдаемый порядок сходимости на последнем измельчении."""
+    return np.log2(errors[-2] / errors[-1]) / np.log2(dxs[-2] / dxs[-1])
+
+
+def check_convergence(dxs=CONVERGENCE_DX, reference_dx=6.25):
+    """Ошибка схемы второго и четвёртого порядка против расчёта на мелкой сетке.
+
+    Ошибка берётся в общих узлах с эталоном относительно его амплитуды.
+
+    Пространственная сходимость: все сетки и эталон (четвёртый порядок с
+    шагом reference_dx) считаются с одним и тем же dt, устойчивым для самой
+    мелкой сетки. Ошибка по времени у них общая, и разность с эталоном
+    показывает порядок лапласиана: около 2 и около 4.
+
+    Практическая точность: каждая сетка со своим dt по условию Куранта
+    (CONVERGENCE_COURANT), эталон — с малым числом Куранта. Здесь общий
+    порядок ограничен вторым порядком схемы по времени, а coarsening — во
+    сколько раз по каждой оси сетка четвёртого порядка может быть крупнее
+    при той же ошибке.
+    """
+    dt = _pulse_dt(reference_dx, 4, courant=0.9)
+    references = {"spatial": _pulse(reference_dx, 4, dt),
+                  "time": _pulse(reference_dx, 4, _pulse_dt(reference_dx, 4, courant=0.25))}
+
+    def error(field, dx, kind):
+        reference = references[kind]
+        k = int(round(dx / reference_dx))
+        return np.max(np.abs(field - reference[::k, ::k])) / np.max(np.abs(reference))
+
+    results = {}
+    errors = {}
+    for order, courant in CONVERGENCE_COURANT.items():
+        spatial = [error(_pulse(dx, order, dt), dx, "spatial") for dx in dxs]
+        results[f"convergence/order={order}/spatial_rate"] = _result(_rate(spatial, dxs), "порядок")
+
+        errors[order] = [error(_pulse(dx, order, _pulse_dt(dx, order, courant)), dx, "time") for dx in dxs]
+        for dx, value in zip(dxs, errors[order]):
+            results[f"convergence/order={order}/dx={dx:g}"] = _result(value, "отн. ошибка", higher_is_better=False,
+                                                                     courant=courant)
+        results[f"convergence/order={order}/rate"] = _result(_rate(errors[order], dxs), "порядок")
+
+    # Шаг второго порядка с той же ошибкой, что у четвёртого на самой крупной сетке
+    rate = results["convergence/order=2/rate"]["value"]
+    equivalent = dxs[0] * (errors[4][0] / errors[2][0]) ** (1 / rate)
+    results["convergence/coarsening"] = _result(dxs[0] / equivalent, "раз по оси")
+    return results
+
+
+def bench_rays(counts=RAY_COUNTS, samples=500, t_end=20):
+    """Лучей в секунду для веера mmm.py над горой."""
+    seabed = AnalyticSeabed("Гора", **DEFAULT_SEABED)
+    L = DEFAULT_SEABED["L"]
+    t_eval = np.linspace(0, t_end, samples)
+    results = {}
+    for count in counts:
+        z0 = initial_fan(0.2 * L, 0.2 * L, 9, count)
+        elapsed = _best_time(lambda: integrate_rays(z0, t_eval, seabed), repeat=2)
+        results[f"rays/n={count}"] = _result(count / elapsed, "луч/с")
+    return results
+
+
+def bench_render(nx=60, frames=20, resolution=60, dtypes=("float64", "float32")):
+    """Кадров в секунду при отрисовке WaveFigure через Agg (без расчёта)."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    from render import WaveFigure
+
+    results = {}
+    for dtype in dtypes:
+        # float32 — поля решателя в той же точности, что и с --dtype float32
+        solver = _make_solver(nx, dtype=dtype)
+        X, Y = np.meshgrid(solver.x, solver.y)
+        zmax = solver.rest_level + 10
+        fig = Figure(figsize=(18, 8), dpi=100)
+        canvas = FigureCanvasAgg(fig)
+        view = WaveFigure(fig, X, Y, solver.D, solver.state, solver.x[-1], solver.rest_level, zmax,
+                          resolution=resolution)
+        # Кадры считаются заранее, чтобы в замер попала только отрисовка
+        states = [solver.step(5).copy() for _ in range(frames)]
+        canvas.draw()
+
+        def draw_all():
+            for eta in states:
+                view.update(eta)
+                canvas.draw()
+
+        elapsed = _best_time(draw_all, repeat=1)
+        name = f"render/nx={nx}" if dtype == "float64" else f"render/nx={nx}/{dtype}"
+        results[name] = _result(frames / elapsed, "кадр/с", frames=frames)
+    return results
+
+
+def bench_ray_render(count=2000, samples=500, frames=20, t_end=20):
+    """Кадров в секунду при отрисовке веера mmm.py через RayRenderer и Agg."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    from render import RayRenderer
+
+    seabed = AnalyticSeabed("Гора", **DEFAULT_SEABED)
+    L = DEFAULT_SEABED["L"]
+    trajectories = integrate_rays(initial_fan(0.2 * L, 0.2 * L, 9, count), np.linspace(0, t_end, samples), seabed)
+    fig = Figure(figsize=(6, 6), dpi=100)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.set_xlim(0, L)
+    ax.set_ylim(0, L)
+    view = RayRenderer(ax, trajectories)
+    canvas.draw()
+
+    def draw_all():
+        for frame in np.linspace(0, samples - 1, frames).astype(int):
+            view.update(frame)
+            canvas.draw()
+
+    elapsed = _best_time(draw_all, repeat=1)
+    return {f"render/rays/n={count}": _result(frames / elapsed, "кадр/с", frames=frames)}
+
+
+def bench_export(nx=60, frames=20, processes=None):
+    """Кадров в секунду при записи GIF через export_animation (расчёт и отрисовка)."""
+    from export import export_animation
+
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for ext in ("gif", "png"):
+            solver = _make_solver(nx)
+            start = time.perf_counter()
+            export_animation(solver, os.path.join(folder, f"bench.{ext}"), frames, steps_per_frame=5,
+                             processes=processes, zmax=solver.rest_level + 10)
+            elapsed = time.perf_counter() - start
+            results[f"export/{ext}/nx={nx}"] = _result(frames / elapsed, "кадр/с", frames=frames)
+    return results
+
+
+def compare(current, baseline, tolerance=0.2):
+    """Замеры, ухудшившиеся относительно baseline больше чем на tolerance.
+
+    Возвращает список (имя, было, стало, отношение); отношение > 1 — лучше.
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None or not old["value"]:
+            continue
+        ratio = result["value"] / old["value"]
+        if not result["higher_is_better"]:
+            ratio = 1 / ratio
+        if ratio < 1 - tolerance:
+            regressions.append((name, old["value"], result["value"], ratio))
+    return regressions
+
+
+def settings_mismatch(current, baseline):
+    """Настройки прогона, отличающиеся от baseline: список (имя, было, стало)."""
+    old = baseline.get("settings", {})
+    return [(name, old.get(name), value) for name, value in current["settings"].items() if old.get(name) != value]
+
+
+def environment():
+    """Описание машины и версий, записываемое рядом с замерами."""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры производительности")
+    parser.add_argument("--only", default="stencil,active,ensemble,precision,convergence,rays,render,export",
+                        help="Набор замеров через запятую: stencil, active, ensemble, precision, convergence, "
+                             "rays, render, export")
+    parser.add_argument("--quick", action="store_true", help="Сокращённый набор размеров")
+    parser.add_argument("--workers", type=int, default=1, help="Потоков для шага схемы")
+    parser.add_argument("--dtype", default="float64", choices=["float64", "float32"], help="Точность шага схемы")
+    parser.add_argument("--order", type=int, default=2, choices=[2, 4], help="Порядок лапласиана для шага схемы")
+    parser.add_argument("--precision-limit", type=float, default=1e-3,
+                        help="Допустимая относительная ошибка float32 против float64")
+    parser.add_argument("--min-rate", type=float, default=1.8,
+                        help="Наименьший допустимый общий порядок сходимости (dt по условию Куранта)")
+    parser.add_argument("--min-spatial-rate", type=float, default=3.5,
+                        help="Наименьший допустимый порядок по пространству для --order 4")
+    parser.add_argument("--min-coarsening", type=float, default=2,
+                        help="Во сколько раз по оси сетка четвёртого порядка должна быть крупнее при той же ошибке")
+    parser.add_argument("--processes", type=int, help="Процессов для записи анимации")
+    parser.add_argument("--out", help="Записать результаты в JSON")
+    parser.add_argument("--baseline", help="JSON с прошлыми результатами для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Допустимое замедление (доля)")
+    args = parser.parse_args(argv)
+
+    only = set(args.only.split(","))
+    results = {}
+    if "stencil" in only:
+        results.update(bench_stencil(QUICK_STENCIL_SIZES if args.quick else STENCIL_SIZES, args.workers, args.dtype,
+                                     args.order))
+    if "active" in only:
+        results.update(bench_active())
+    if "ensemble" in only:
+        results.update(bench_ensemble())
+    failed = False
+    if "precision" in only:
+        precision = check_precision()
+        results.update(precision)
+        for name, result in precision.items():
+            if name.startswith("precision/") and result["value"] > args.precision_limit:
+                print(f"Ошибка {name} больше допустимой: {result['value']:.2e} > {args.precision_limit:.0e}")
+                failed = True
+    if "convergence" in only:
+        convergence = check_convergence()
+        results.update(convergence)
+        limits = {"convergence/order=2/rate": args.min_rate, "convergence/order=4/rate": args.min_rate,
+                  "convergence/order=4/spatial_rate": args.min_spatial_rate,
+                  "convergence/coarsening": args.min_coarsening}
+        for name, limit in limits.items():
+            value = convergence[name]["value"]
+            if value < limit:
+                print(f"{name} ниже допустимого: {value:.2f} < {limit}")
+                failed = True
+    if "rays" in only:
+        results.update(bench_rays(QUICK_RAY_COUNTS if args.quick else RAY_COUNTS))
+    if "render" in only:
+        results.update(bench_render())
+        results.update(bench_ray_render())
+    if "export" in only:
+        results.update(bench_export(processes=args.processes))
+
+    settings = {"dtype": args.dtype, "order": args.order, "workers": args.workers, "processes": args.processes,
+                "quick": args.quick}
+    report = {"environment": environment(), "settings": settings, "results": results}
+    for name, result in results.items():
+        print(f"{name:30s} {result['value']:12.4g} {result['unit']}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        # Замеры с другой точностью или числом потоков — это другие замеры
+        mismatch = settings_mismatch(report, baseline)
+        if mismatch:
+            for name, old, new in mismatch:
+                print(f"Настройка {name} отличается от baseline: {old} -> {new}")
+            sys.exit("Сравнение с baseline невозможно: запустите с теми же настройками")
+        regressions = compare(report, baseline, args.tolerance)
+        for name, old, new, ratio in regressions:
+            print(f"Замедление {name}: {old:.2f} -> {new:.2f} ({ratio:.2f}x)")
+        if regressions:
+            failed = True
+        else:
+            print("Замедлений нет")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
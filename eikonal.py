@@ -0,0 +1,124 @@
+"""Время первого прихода волны T(x, y) методом быстрого марша.
+
+Решается уравнение эйконала |grad T| = 1 / c с c = sqrt(g * D) (см.
+rays.AnalyticSeabed.speed). Узлы принимаются в порядке возрастания T из
+кучи (heapq), поэтому весь расчёт занимает O(N log N) для N узлов сетки,
+а карта не имеет теневых зон, как у веера лучей.
+
+    python eikonal.py --profile Гора --n 300 --out arrival.npy
+"""
+import argparse
+import heapq
+import math
+import time
+
+import numpy as np
+
+from rays import DEFAULT_SEABED, AnalyticSeabed
+
+
+def fast_marching(c, hx, hy, start):
+    """Поле времени прихода на сетке скоростей c (узлы [j, i]).
+
+    start — список (j, i, t0) стартовых узлов с известным временем.
+    Узлы с c <= 0 или NaN (суша) непроходимы и получают T = inf.
+    """
+    ny, nx = c.shape
+    slowness = np.full(c.shape, np.inf)
+    water = np.isfinite(c) & (c > 0)
+    slowness[water] = 1 / c[water]
+    # Питоновские списки быстрее поэлементного доступа к массивам numpy
+    slowness = slowness.tolist()
+
+    T = [[math.inf] * nx for _ in range(ny)]
+    known = [[False] * nx for _ in range(ny)]
+    heap = []
+    for j, i, t0 in start:
+        T[j][i] = t0
+        heapq.heappush(heap, (t0, j, i))
+
+    while heap:
+        t, j, i = heapq.heappop(heap)
+        if known[j][i]:
+            continue  # Устаревшая запись: узел уже принят с меньшим временем
+        known[j][i] = True
+        for nj, ni in ((j - 1, i), (j + 1, i), (j, i - 1), (j, i + 1)):
+            if not (0 <= nj < ny and 0 <= ni < nx) or known[nj][ni]:
+                continue
+            f = slowness[nj][ni]
+            if f == math.inf:
+                continue
+            new = _update(T, known, nj, ni, nx, ny, hx, hy, f)
+            if new < T[nj][ni]:
+                T[nj][ni] = new
+                heapq.heappush(heap, (new, nj, ni))
+    return np.array(T)
+
+
+def _update(T, known, j, i, nx, ny, hx, hy, f):
+    """Решение разностного уравнения эйконала в узле (j, i) по принятым соседям."""
+    a = min(T[j][i - 1] if i > 0 and known[j][i - 1] else math.inf,
+            T[j][i + 1] if i < nx - 1 and known[j][i + 1] else math.inf)
+    b = min(T[j - 1][i] if j > 0 and known[j - 1][i] else math.inf,
+            T[j + 1][i] if j < ny - 1 and known[j + 1][i] else math.inf)
+
+    # Одномерное обновление по одному направлению
+    one_sided = min(a + hx * f, b + hy * f)
+    if a == math.inf or b == math.inf:
+        return one_sided
+
+    # ((T - a) / hx)^2 + ((T - b) / hy)^2 = f^2
+    wa, wb = 1 / hx ** 2, 1 / hy ** 2
+    p = wa + wb
+    q = -2 * (a * wa + b * wb)
+    r = a * a * wa + b * b * wb - f * f
+    disc = q * q - 4 * p * r
+    if disc < 0:
+        return one_sided
+    t = (-q + math.sqrt(disc)) / (2 * p)
+    return t if t >= max(a, b) else one_sided
+
+
+def arrival_map(seabed, L, n, x0, y0):
+    """Карта времени прихода от точечного источника (x0, y0) в области [0, Lx] x [0, Ly].
+
+    L — сторона квадрата или пара (Lx, Ly). Возвращает x, y и T формы (n, n).
+    Узлы ячейки с источником стартуют со временем, равным расстоянию до
+    источника, делённому на скорость в нём.
+    """
+    Lx, Ly = L if np.ndim(L) else (L, L)
+    x = np.linspace(0, Lx, n)
+    y = np.linspace(0, Ly, n)
+    X, Y = np.meshgrid(x, y)
+    c = seabed.speed(X, Y)
+    hx, hy = x[1] - x[0], y[1] - y[0]
+
+    c0 = float(seabed.speed(np.array(x0), np.array(y0)))
+    i = min(int(x0 / hx), n - 2)
+    j = min(int(y0 / hy), n - 2)
+    start = [(nj, ni, math.hypot(x[ni] - x0, y[nj] - y0) / c0)
+             for nj in (j, j + 1) for ni in (i, i + 1)]
+    return x, y, fast_marching(c, hx, hy, start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Карта времени первого прихода волны")
+    parser.add_argument("--profile", default="Гора", help="Тип профиля глубины")
+    parser.add_argument("--x0", type=float, default=20, help="Источник x0 (%%)")
+    parser.add_argument("--y0", type=float, default=20, help="Источник y0 (%%)")
+    parser.add_argument("--n", type=int, default=200, help="Узлов сетки по стороне")
+    parser.add_argument("--out", help="Сохранить T в .npy")
+    args = parser.parse_args(argv)
+
+    L = DEFAULT_SEABED["L"]
+    seabed = AnalyticSeabed(args.profile, **DEFAULT_SEABED)
+    start = time.perf_counter()
+    x, y, T = arrival_map(seabed, L, args.n, args.x0 / 100 * L, args.y0 / 100 * L)
+    print(f"Сетка {args.n}x{args.n}: {time.perf_counter() - start:.2f} с, "
+          f"T от {np.min(T):.2f} до {np.max(T[np.isfinite(T)]):.2f} с")
+    if args.out:
+        np.save(args.out, T)
+
+
+if __name__ == "__main__":
+    main()
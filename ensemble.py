@@ -0,0 +1,194 @@
+"""Ансамбль сценариев на одной сетке: все члены считаются одним вызовом схемы.
+
+Члены ансамбля различаются источниками и множителем скорости, дно у всех
+общее. Слои eta хранятся массивом (M, ny, nx), коэффициент схемы — свой у
+каждого члена, а шаг по времени общий (по самому быстрому члену).
+
+    python ensemble.py --members 64 --source 50,50,40,10 --height-range 0.5,1.5 --steps 1000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from bathymetry import FILE_PROFILE, default_cache
+from solver import (ACTIVE_TOL, G, DEFAULT_PARAMS, SourceQueue, add_model_arguments, apply_sponge, build_solver,
+                    model_extent, neumann_boundary, parse_source, sponge_damping, sponge_strips, stable_dt,
+                    stamp_source, wave_step)
+
+# Члены считаются блоками, чтобы пять массивов блока (три слоя, coef и
+# scratch) помещались в кэш процессора второго уровня
+BLOCK_BYTES = 2 * 1024 * 1024
+
+
+class EnsembleSolver:
+    """Явная схема WaveSolver сразу для M членов ансамбля.
+
+    Использование:
+        ensemble = EnsembleSolver(dx=5, rest_level=D0)
+        ensemble.init(D, [{"sources": [...], "speed_multiplier": 1.0}, ...], x, y)
+        ensemble.step(100)
+        eta = ensemble.state  # (M, ny, nx)
+    """
+
+    def __init__(self, dx=5, dt=None, rest_level=0.0, g=G, courant=0.9, dtype=np.float64, block=None,
+                 order=2, sponge=0, sponge_strength=5.0):
+        self.dx = dx
+        self.dt = dt  # None — выбрать по условию Куранта для самого быстрого члена
+        self.courant = courant
+        self.rest_level = rest_level
+        self.g = g
+        self.dtype = np.dtype(dtype)
+        self.block = block  # Членов в одном вызове схемы; None — по BLOCK_BYTES
+        self.order = order  # Порядок лапласиана, как у WaveSolver
+        # Поглощающий слой, как у WaveSolver; затухание общее для всех членов
+        # и считается по самому быстрому из них
+        self.sponge = int(sponge)
+        self.sponge_strength = sponge_strength
+        self.observers = []  # Вызываются после каждого шага: fn(ensemble)
+
+    def init(self, bathymetry, members, x=None, y=None):
+        """Подготовка состояния всех членов.
+
+        members — список словарей с ключами "sources" (список источников, как
+        у WaveSolver) и "speed_multiplier" (по умолчанию 1).
+        """
+        D = np.asarray(bathymetry, dtype=float)
+        ny, nx = D.shape
+        self.x = np.arange(nx) * self.dx if x is None else np.asarray(x, dtype=float)
+        self.y = np.arange(ny) * self.dx if y is None else np.asarray(y, dtype=float)
+        self.D = D
+
+        self.members = [dict(member, speed_multiplier=member.get("speed_multiplier", 1)) for member in members]
+        multipliers = np.array([member["speed_multiplier"] for member in self.members], dtype=float)
+        base = np.sqrt(self.g * D)  # Скорость при множителе 1
+        if self.dt is None:
+            self.dt = stable_dt(multipliers.max() * base, self.dx, self.courant, self.order)
+        # Коэффициент (c*dt/dx)^2 отдельно для каждого члена
+        self.coef = ((multipliers[:, None, None] * base * self.dt / self.dx) ** 2).astype(self.dtype)
+        self.sponge_strips = []
+        if self.sponge > 0:
+            if 2 * (self.sponge + 1) >= min(D.shape):
+                raise ValueError("Поглощающий слой шире половины сетки!")
+            sigma_max = self.sponge_strength * multipliers.max() * float(np.max(base)) / (self.sponge * self.dx)
+            a = sponge_damping(D.shape, self.sponge, sigma_max, self.dt)
+            self.sponge_gain = (1 / (1 + a)).astype(self.dtype)
+            self.sponge_blend = (a / (1 + a)).astype(self.dtype)
+            self.sponge_strips = sponge_strips(D.shape, self.sponge)
+
+        self.n = 0
+        self.t = 0.0
+        self.queues = [SourceQueue(member.get("sources", [])) for member in self.members]
+
+        shape = (len(self.members), ny, nx)
+        self.eta = np.full(shape, self.rest_level, dtype=self.dtype)
+        self.eta_prev = np.full(shape, self.rest_level, dtype=self.dtype)
+        self._inject()
+        self.eta_next = np.full(shape, self.rest_level, dtype=self.dtype)
+        self.scratch = np.empty_like(self.eta[:, 1:-1, 1:-1])
+
+        block = self.block or max(1, BLOCK_BYTES // (5 * ny * nx * self.dtype.itemsize))
+        self.blocks = [slice(m, m + block) for m in range(0, len(self.members), block)]
+        return self
+
+    @property
+    def state(self):
+        """Поля поверхности всех членов (M, ny, nx); перезаписываются через два шага."""
+        return self.eta
+
+    def step(self, n=1):
+        """Сделать n шагов по времени для всех членов."""
+        ny, nx = self.eta.shape[1:]
+        inner = (1, ny - 1, 1, nx - 1)
+        for _ in range(n):
+            # wave_step и neumann_boundary работают по последним двум осям
+            for b in self.blocks:
+                wave_step(self.eta[b], self.eta_prev[b], self.eta_next[b], self.coef[b], self.scratch[b], inner,
+                          self.order)
+                if self.sponge_strips:
+                    apply_sponge(self.eta_next[b], self.eta_prev[b], self.sponge_gain, self.sponge_blend,
+                                 self.sponge_strips, inner, self.scratch[b])
+                neumann_boundary(self.eta_next[b])
+            self.eta_prev, self.eta, self.eta_next = self.eta, self.eta_next, self.eta_prev
+
+            self.n += 1
+            self.t = self.n * self.dt
+            self._inject()
+            for observer in self.observers:
+                observer(self)
+        return self.eta
+
+    def _inject(self):
+        """Добавить источники членов, время включения которых наступило."""
+        for m, q in enumerate(self.queues):
+            if not q.ready(self.t):
+                continue
+            # Источник стартует с нулевой скоростью, как в WaveSolver
+            for i in q.pop_due(self.t):
+                stamp_source((self.eta[m],), self.x, self.y, q.x[i], q.y[i], q.height[i], q.width[i],
+                             prev=self.eta_prev[m], coef=self.coef[m], dx=self.dx)
+
+
+def build_ensemble(params, members, cache=default_cache):
+    """Ансамбль на дне из параметров формы (см. solver.DEFAULT_PARAMS).
+
+    Множитель скорости из params умножается на множитель каждого члена.
+    """
+    p = dict(DEFAULT_PARAMS, **params)
+    # Дно и сетка берутся из кэша общим путём build_solver
+    base = build_solver(dict(p, speed_multiplier=1, dt=None), [], cache=cache, active_region=False)
+    scale = float(p["speed_multiplier"])
+    members = [dict(member, speed_multiplier=scale * member.get("speed_multiplier", 1)) for member in members]
+    dt = None if p["dt"] is None else float(p["dt"])
+    ensemble = EnsembleSolver(dx=base.dx, dt=dt, rest_level=base.rest_level, courant=base.courant,
+                              dtype=p["dtype"], order=int(p["order"]), sponge=int(p["sponge"]))
+    return ensemble.init(base.D, members, base.x, base.y)
+
+
+def _parse_range(text):
+    low, high = (float(v) for v in text.split(","))
+    return low, high
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ансамбль сценариев на одной сетке")
+    parser.add_argument("--steps", type=int, default=1000, help="Количество шагов по времени")
+    parser.add_argument("--members", type=int, default=16, help="Число членов ансамбля")
+    parser.add_argument("--height-range", type=_parse_range, default=(1, 1),
+                        help="Множитель высоты источников от,до (равномерно по членам)")
+    parser.add_argument("--speed-range", type=_parse_range, default=(1, 1),
+                        help="Множитель скорости от,до (равномерно по членам)")
+    parser.add_argument("--output", help="Сохранить итоговые поля (M, ny, nx) в .npy")
+    add_model_arguments(parser)
+    args = parser.parse_args(argv)
+    # Ансамбль считается одним вызовом схемы по всей сетке, без потоков и замера этапов
+    for flag, used in (("--workers", args.workers != 1), ("--timings", args.timings),
+                       ("--full-grid", args.full_grid), ("--active-tol", args.active_tol != ACTIVE_TOL)):
+        if used:
+            parser.error(f"{flag} не поддерживается ансамблем")
+
+    params = {name: value for name, value in vars(args).items() if name in DEFAULT_PARAMS}
+    if args.bathymetry:
+        params["profile"] = FILE_PROFILE
+    L = model_extent(params)
+    sources = [parse_source(text, L, args.multiplier) for text in args.source]
+    heights = np.linspace(*args.height_range, args.members)
+    speeds = np.linspace(*args.speed_range, args.members)
+    members = [{"sources": [dict(source, height=source["height"] * h) for source in sources],
+                "speed_multiplier": s} for h, s in zip(heights, speeds)]
+
+    ensemble = build_ensemble(params, members)
+    start = time.perf_counter()
+    eta = ensemble.step(args.steps)
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.members} членов, сетка {eta.shape[2]}x{eta.shape[1]}, шагов {args.steps}, dt = {ensemble.dt:.4g} с")
+    print(f"Время расчёта {elapsed:.3f} с ({args.members * args.steps / max(elapsed, 1e-12):.1f} шаг*член/с)")
+    peak = np.abs(eta - ensemble.rest_level).max(axis=(1, 2))
+    print(f"Отклонение в конце: от {peak.min():.4f} до {peak.max():.4f}")
+    if args.output:
+        np.save(args.output, eta)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Запись анимации в GIF или APNG без ImageMagick.
+
+Решатель считает кадры в основном процессе, а пул процессов рисует их через
+Agg (см. render.WaveFigure). Готовые кадры сразу дописываются в файл, поэтому
+в памяти одновременно находится не больше нескольких кадров на процесс.
+
+    python export.py --frames 500 --steps-per-frame 4 --source 50,50,40,10 --out wave.gif
+"""
+import argparse
+import io
+import os
+import struct
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import GifImagePlugin, Image
+
+from solver import add_model_arguments, solver_from_args
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Состояние рабочего процесса: фигура создаётся один раз на процесс
+_worker = {}
+
+
+def _init_worker(layout, dpi, fmt, duration):
+    import numpy as np
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    from render import WaveFigure
+
+    fig = Figure(figsize=layout["figsize"], dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    X, Y = np.meshgrid(layout["x"], layout["y"])
+    view = WaveFigure(fig, X, Y, layout["D"], layout["eta"], layout["L"], layout["rest_level"],
+                      layout["zmax"], resolution=layout["resolution"])
+    _worker.update(view=view, canvas=canvas, fmt=fmt, duration=duration)
+
+
+def _render_frame(eta):
+    """Нарисовать кадр и вернуть (размер, закодированные байты кадра)."""
+    _worker["view"].update(eta)
+    canvas = _worker["canvas"]
+    canvas.draw()
+    image = Image.frombuffer("RGBA", canvas.get_width_height(), canvas.buffer_rgba()).convert("RGB")
+
+    if _worker["fmt"] == "gif":
+        # Своя палитра у каждого кадра
+        image = image.quantize(256, method=Image.Quantize.FASTOCTREE)
+        data = GifImagePlugin.getdata(image, duration=_worker["duration"], include_color_table=True)
+        return image.size, b"".join(data)
+
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG", compress_level=6)
+    return image.size, buffer.getvalue()
+
+
+class GifWriter:
+    """Потоковая запись GIF из кадров, закодированных в _render_frame."""
+
+    def __init__(self, fp, frames, duration):
+        self.fp = fp
+        self.duration = duration
+        self.started = False
+
+    def write(self, size, data):
+        if not self.started:
+            header, _ = GifImagePlugin.getheader(Image.new("P", size), info={"loop": 0, "duration": self.duration})
+            self.fp.write(b"".join(header))
+            self.started = True
+        self.fp.write(data)
+
+    def close(self):
+        self.fp.write(b";")
+
+
+class ApngWriter:
+    """Потоковая запись APNG: кадры-PNG пересобираются в fcTL/fdAT-блоки."""
+
+    def __init__(self, fp, frames, duration):
+        self.fp = fp
+        self.frames = frames
+        self.duration = int(round(duration))
+        self.sequence = 0
+        self.started = False
+
+    def _chunk(self, kind, data):
+        self.fp.write(struct.pack(">I", len(data)) + kind + data)
+        self.fp.write(struct.pack(">I", zlib.crc32(kind + data)))
+
+    def write(self, size, data):
+        chunks = list(_png_chunks(data))
+        if not self.started:
+            self.fp.write(PNG_SIGNATURE)
+            for kind, body in chunks:
+                if kind == b"IHDR":
+                    self._chunk(kind, body)
+            self._chunk(b"acTL", struct.pack(">II", self.frames, 0))
+
+        width, height = size
+        self._chunk(b"fcTL", struct.pack(">IIIIIHHBB", self.sequence, width, height, 0, 0,
+                                         self.duration, 1000, 0, 0))
+        self.sequence += 1
+        for kind, body in chunks:
+            if kind != b"IDAT":
+                continue
+            if not self.started:
+                # Первый кадр одновременно служит обычным изображением PNG
+                self._chunk(b"IDAT", body)
+            else:
+                self._chunk(b"fdAT", struct.pack(">I", self.sequence) + body)
+                self.sequence += 1
+        self.started = True
+
+    def close(self):
+        self._chunk(b"IEND", b"")
+
+
+def _png_chunks(data):
+    pos = len(PNG_SIGNATURE)
+    while pos < len(data):
+        length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        yield kind, data[pos + 8:pos + 8 + length]
+        pos += length + 12
+
+
+def export_animation(solver, filename, frames, steps_per_frame=1, fps=25, processes=None, dpi=100,
+                     L=None, zmax=None, resolution=60, figsize=(18, 8), timer=None):
+    """Записать frames кадров, делая steps_per_frame шагов решателя на кадр.
+
+    Формат выбирается по расширению: .png/.apng — APNG, иначе GIF.
+    processes — число процессов отрисовки, по умолчанию по числу ядер.
+    timer — PhaseTimer; по умолчанию берётся таймер решателя. Отрисовка идёт
+    в других процессах, поэтому "render" — время ожидания готового кадра.
+    """
+    timer = timer or solver.timer
+    fmt = "png" if filename.lower().endswith((".png", ".apng")) else "gif"
+    processes = processes or os.cpu_count() or 1
+    duration = 1000 / fps
+
+    layout = {
+        "x": solver.x,
+        "y": solver.y,
+        "D": solver.D,
+        "eta": solver.state.copy(),
+        "L": (solver.x[-1], solver.y[-1]) if L is None else L,
+        "rest_level": solver.rest_level,
+        "zmax": solver.state.max() if zmax is None else zmax,
+        "resolution": resolution,
+        "figsize": figsize,
+    }
+
+    writer_class = ApngWriter if fmt == "png" else GifWriter
+    with open(filename, "wb") as fp, ProcessPoolExecutor(processes, initializer=_init_worker,
+                                                         initargs=(layout, dpi, fmt, duration)) as pool:
+        writer = writer_class(fp, frames, duration)
+        pending = deque()
+        for _ in range(frames):
+            eta = solver.step(steps_per_frame).copy()
+            pending.append(pool.submit(_render_frame, eta))
+            # Ограничиваем число кадров в очереди, чтобы не копить их в памяти
+            if len(pending) >= 2 * processes:
+                _write_next(writer, pending, timer)
+        while pending:
+            _write_next(writer, pending, timer)
+        writer.close()
+
+
+def _write_next(writer, pending, timer):
+    """Дождаться самого старого кадра и дописать его в файл."""
+    with timer.phase("render"):
+        frame = pending.popleft().result()
+    with timer.phase("save"):
+        writer.write(*frame)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Запись анимации волны в GIF/APNG")
+    parser.add_argument("--frames", type=int, default=200, help="Количество кадров")
+    parser.add_argument("--steps-per-frame", type=int, default=1, help="Шагов схемы на один кадр")
+    parser.add_argument("--fps", type=float, default=25)
+    parser.add_argument("--processes", type=int, help="Число процессов отрисовки")
+    parser.add_argument("--dpi", type=int, default=100)
+    parser.add_argument("--resolution", type=int, default=60, help="Узлов 3D-сетки по стороне")
+    parser.add_argument("--out", default="tsunami_wave.gif", help="Имя файла (.gif или .png)")
+    add_model_arguments(parser)
+    args = parser.parse_args(argv)
+
+    solver = solver_from_args(args)
+    L = (solver.x[-1], solver.y[-1])
+    zmax = solver.rest_level + max([source["height"] for source in solver.sources] + [0])
+
+    start = time.perf_counter()
+    export_animation(solver, args.out, args.frames, args.steps_per_frame, fps=args.fps,
+                     processes=args.processes, dpi=args.dpi, L=L, zmax=zmax, resolution=args.resolution)
+    solver.close()
+    print(f"{args.out}: {args.frames} кадров за {time.perf_counter() - start:.1f} с")
+    if solver.timer.enabled:
+        print(solver.timer.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Виртуальные мареографы: уровень воды в заданных точках на каждом шаге.
+
+Веса билинейной интерполяции считаются один раз при создании, а значения
+пишутся в заранее выделенный буфер, поэтому запись не требует сохранять
+кадры целиком.
+
+    gauges = GaugeRecorder(solver, [(250, 40), (100, 280)], names=["порт", "мыс"])
+    solver.observers.append(gauges)
+    solver.step(1000)
+    gauges.to_csv("gauges.csv")
+"""
+import csv
+
+import numpy as np
+
+
+def bilinear_weights(x, y, points):
+    """Плоские индексы четырёх узлов (k, 4) и их веса для точек (k, 2).
+
+    x, y — возрастающие координаты узлов сетки; точки вне сетки — ошибка.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    px, py = points[:, 0], points[:, 1]
+    if np.any((px < x[0]) | (px > x[-1]) | (py < y[0]) | (py > y[-1])):
+        raise ValueError("Мареограф вне расчётной области!")
+
+    i = np.clip(np.searchsorted(x, px, side="right") - 1, 0, len(x) - 2)
+    j = np.clip(np.searchsorted(y, py, side="right") - 1, 0, len(y) - 2)
+    fx = (px - x[i]) / (x[i + 1] - x[i])
+    fy = (py - y[j]) / (y[j + 1] - y[j])
+
+    nx = len(x)
+    index = np.stack([j * nx + i, j * nx + i + 1, (j + 1) * nx + i, (j + 1) * nx + i + 1], axis=1)
+    weights = np.stack([(1 - fx) * (1 - fy), fx * (1 - fy), (1 - fx) * fy, fx * fy], axis=1)
+    return index, weights
+
+
+class GaugeRecorder:
+    """Наблюдатель решателя: уровень в точках на каждом every-м шаге.
+
+    points — координаты (x, y) в единицах сетки решателя.
+    capacity — число записей в буфере; при заполнении буфер удваивается,
+    а при ring=True перезаписываются самые старые записи (остаются
+    последние capacity значений).
+    """
+
+    def __init__(self, solver, points, every=1, capacity=1024, ring=False, names=None):
+        self.index, self.weights = bilinear_weights(solver.x, solver.y, points)
+        self.points = np.asarray(points, dtype=float).reshape(-1, 2)
+        names = names or [None] * len(self.points)
+        self.names = [name or f"gauge{k}" for k, name in enumerate(names)]
+        self.every = every
+        self.ring = ring
+
+        self.times = np.empty(capacity)
+        self.values = np.empty((capacity, len(self.points)))
+        self.count = 0  # Всего записей, включая перезаписанные
+        self.record(solver)
+
+    def __call__(self, solver):
+        if solver.n % self.every == 0:
+            self.record(solver)
+
+    def sample(self, eta):
+        """Уровень в точках мареографов для поля eta."""
+        return np.einsum("kc,kc->k", np.take(eta, self.index), self.weights)
+
+    def record(self, solver):
+        capacity = len(self.times)
+        if self.count == capacity and not self.ring:
+            self.times = np.resize(self.times, 2 * capacity)
+            self.values = np.resize(self.values, (2 * capacity, self.values.shape[1]))
+            capacity *= 2
+        slot = self.count % capacity
+        self.times[slot] = solver.t
+        self.values[slot] = self.sample(solver.state)
+        self.count += 1
+
+    def series(self):
+        """Моменты времени (n,) и уровни (n, k) в хронологическом порядке."""
+        capacity = len(self.times)
+        if self.count <= capacity:
+            return self.times[:self.count].copy(), self.values[:self.count].copy()
+        order = np.arange(self.count, self.count + capacity) % capacity
+        return self.times[order], self.values[order]
+
+    def to_csv(self, path):
+        times, values = self.series()
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["t"] + self.names)
+            for t, row in zip(times, values):
+                writer.writerow([f"{t:.6g}"] + [f"{v:.6g}" for v in row])
+
+    def to_npy(self, path):
+        """Массив (n, 1 + k): первый столбец — время."""
+        times, values = self.series()
+        np.save(path, np.column_stack([times, values]))
+
+    def save(self, path):
+        """Записать в CSV или NPY по расширению файла."""
+        if path.lower().endswith(".npy"):
+            self.to_npy(path)
+        else:
+            self.to_csv(path)
+
+
+def parse_gauge(text, L):
+    """Мареограф из строки "x%,y%[,имя]": координаты и имя (или None).
+
+    L — размер области или пара (Lx, Ly), как в solver.parse_source.
+    """
+    parts = text.split(",")
+    if len(parts) not in (2, 3):
+        raise ValueError(f"Ожидалось x,y[,имя], получено: {text}")
+    Lx, Ly = L if isinstance(L, tuple) else (L, L)
+    return (float(parts[0]) * Lx / 100, float(parts[1]) * Ly / 100), (parts[2] if len(parts) == 3 else None)
@@ -0,0 +1,121 @@
+"""Окно просмотра расчёта, не блокирующее форму tkinter.
+
+Решатель работает в отдельном потоке и кладёт последний кадр в очередь на
+одно место; окно забирает кадры по таймеру root.after с постоянной частотой.
+Если отрисовка не успевает, старый кадр заменяется новым, поэтому скорость
+расчёта не зависит от скорости отрисовки.
+"""
+import queue
+import threading
+import tkinter as tk
+from tkinter import ttk
+
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+from matplotlib.figure import Figure
+
+
+class SolverThread(threading.Thread):
+    """Поток расчёта: frames кадров по steps_per_frame шагов решателя."""
+
+    def __init__(self, solver, frames, steps_per_frame=1):
+        super().__init__(daemon=True)
+        self.solver = solver
+        self.frames = frames
+        self.steps_per_frame = steps_per_frame
+        self.latest = queue.Queue(maxsize=1)  # Только последний кадр
+        self.stopped = threading.Event()
+        self.dropped = 0  # Кадров, заменённых до показа
+        self.error = None
+
+    def run(self):
+        try:
+            for _ in range(self.frames):
+                if self.stopped.is_set():
+                    break
+                eta = self.solver.step(self.steps_per_frame).copy()
+                self.publish((self.solver.n, self.solver.t, eta))
+        except Exception as error:  # Ошибка показывается в окне, а не теряется в потоке
+            self.error = error
+
+    def publish(self, frame):
+        """Положить кадр, выбросив непоказанный предыдущий."""
+        try:
+            self.latest.put_nowait(frame)
+        except queue.Full:
+            try:
+                self.latest.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+            self.latest.put_nowait(frame)
+
+    def stop(self):
+        self.stopped.set()
+
+
+class LiveViewer:
+    """Окно Toplevel с фигурой, обновляемой из потока расчёта.
+
+    make_view(fig) строит представление (например, render.WaveFigure) на
+    пустой фигуре и возвращает объект с методом update(eta).
+    """
+
+    def __init__(self, master, solver, make_view, frames, steps_per_frame=1, fps=20,
+                 figsize=(18, 8), title="Расчёт", on_close=None):
+        self.solver = solver
+        self.interval = max(1, int(1000 / fps))
+        self.on_close = on_close
+        self.shown = 0
+
+        self.window = tk.Toplevel(master)
+        self.window.title(title)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.fig = Figure(figsize=figsize)
+        self.view = make_view(self.fig)
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.window)
+        NavigationToolbar2Tk(self.canvas, self.window).update()
+        self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        self.status = ttk.Label(self.window)
+        self.status.pack(side=tk.BOTTOM, fill=tk.X)
+        self.canvas.draw()
+
+        self.thread = SolverThread(solver, frames, steps_per_frame)
+        self.thread.start()
+        self._job = self.window.after(self.interval, self._poll)
+
+    def _poll(self):
+        timer = self.solver.timer
+        try:
+            n, t, eta = self.thread.latest.get_nowait()
+        except queue.Empty:
+            pass
+        else:
+            with timer.phase("render"):
+                self.view.update(eta)
+            with timer.phase("draw"):
+                self.canvas.draw()
+            self.shown += 1
+            self.status.config(text=f"Шаг {n}, t = {t:.1f} с, показано кадров {self.shown}, "
+                                    f"пропущено {self.thread.dropped}")
+
+        if self.thread.error is not None:
+            self.status.config(text=f"Ошибка расчёта: {self.thread.error}")
+            self._job = None
+        elif self.thread.is_alive() or not self.thread.latest.empty():
+            self._job = self.window.after(self.interval, self._poll)
+        else:
+            self._job = None
+            self.status.config(text=self.status.cget("text") + " — расчёт завершён")
+
+    def close(self):
+        """Остановить расчёт и закрыть окно."""
+        if self._job is not None:
+            self.window.after_cancel(self._job)
+            self._job = None
+        self.thread.stop()
+        self.thread.join()
+        self.solver.close()
+        self.window.destroy()
+        if self.on_close is not None:
+            self.on_close(self)
@@ -1,10 +1,16 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
 from mpl_toolkits.mplot3d import Axes3D
 import tkinter as tk
-from tkinter import ttk
+from tkinter import filedialog, ttk
 import datetime
+import threading
+
+from export import export_animation
+from live import LiveViewer
+from profiling import PhaseTimer
+from render import WaveFigure
+from bathymetry import FILE_PROFILE
+from solver import build_solver, model_extent
 
 
 sources = []
@@ -12,10 +18,10 @@ sources = []
 def add_source():
     multiplier = float(multiplier_var.get())
     print(multiplier)
-    L = int(length_var.get()) * multiplier
+    Lx, Ly = model_extent(form_params())
 
-    x = float(source_x_var.get()) * L / 100
-    y = float(source_y_var.get()) * L / 100
+    x = float(source_x_var.get()) * Lx / 100
+    y = float(source_y_var.get()) * Ly / 100
     height = float(source_height_var.get())*multiplier
     width = float(source_width_var.get())*multiplier
     sources.append({"x": x, "y": y, "height": height, "width": width})
@@ -26,211 +32,219 @@ def clear_sources():
     sources.clear()
     sources_listbox.delete(0, tk.END)
 
+def choose_bathymetry():
+    path = filedialog.askopenfilename(title="Файл дна",
+                                      filetypes=[("Сетка глубин", "*.npy *.asc"), ("Все файлы", "*.*")])
+    if path:
+        bathymetry_var.set(path)
+        depth_profile_var.set(FILE_PROFILE)
+
+
+def form_params():
+    """Параметры модели из полей формы (см. solver.DEFAULT_PARAMS)."""
+    return {
+        "profile": depth_profile_var.get(),  # Тип профиля
+        "L": length_var.get(),
+        "D0": depth_var.get(),
+        "hill_height": hill_height_var.get(),
+        "hill_width": hill_width_var.get(),
+        "hill_x": hill_x_var.get(),
+        "hill_y": hill_y_var.get(),
+        "multiplier": float(multiplier_var.get()),
+        "speed_multiplier": speed_multiplier_var.get(),
+        "courant": courant_var.get(),
+        "seed": seed_var.get(),
+        "dtype": dtype_var.get(),
+        "sponge": sponge_var.get(),
+        "order": int(order_var.get()),
+        "dx": dx_var.get(),
+        "bathymetry": bathymetry_var.get() or None,
+        "bathymetry_window": [int(v) for v in window_var.get().split(",")] if window_var.get().strip() else None,
+        "bathymetry_cellsize": cellsize_var.get() or None,
+        # Большой файл укрупняется до 1000 узлов по стороне, даже если dx мельче
+        "bathymetry_max_size": 1000,
+    }
+
+
 def run_simulation():
     multiplier = float(multiplier_var.get())
-    speed_multiplier = float(speed_multiplier_var.get())
-
-    L = int(length_var.get())*multiplier
     D0 = float(depth_var.get())*multiplier
 
-    hill_height = float(hill_height_var.get())*multiplier
-    hill_width = float(hill_width_var.get())*multiplier
-    hill_x = L*float(hill_x_var.get())/100
-    hill_y = L*float(hill_y_var.get())/100
-
-
-    # Пространственные параметры
-    dx = 5
-    nx = int(L / dx)
-    x = np.linspace(0, L, nx)
-    y = np.linspace(0, L, nx)
-    X, Y = np.meshgrid(x, y)
-
-    # Параметры времени
-    dt = 0.05  # Шаг по времени
-    t_steps = int(gif_time_var.get())  # Количество временных шагов
-
-    # Выбор профиля глубины
-    profile_type = depth_profile_var.get()  # Тип профиля
-
-    def depth_profile(x, y, profile_type):
-        if profile_type == "Гора":
-            return D0 - hill_height * np.exp(-((x - hill_x) ** 2 + (y - hill_y) ** 2) / (2 * hill_width ** 2))
-        elif profile_type == "Впадина":
-            return D0 + hill_height * np.exp(-((x - hill_x) ** 2 + (y - hill_y) ** 2) / (2 * hill_width ** 2))
-        elif profile_type == "Хребет":
-            return D0 - hill_height * np.exp(-(x - hill_x) ** 2 / (2 * hill_width ** 2))
-        elif profile_type == "Плато":
-            return D0 - hill_height * (x / L)
-        elif profile_type == "Случайный":
-            return D0 - hill_height * np.random.rand(*x.shape)
-        elif profile_type == "Многослойный":
-            layer_width = L / 4  # Ширина одного слоя
-            return D0 - hill_height * (np.floor(x / layer_width) % 2)
-        else:
-            raise ValueError("Неизвестный тип профиля!")
-
-
-    D = depth_profile(X, Y, profile_type)
-    g = 9.81
-    c = speed_multiplier*np.sqrt(g * D)  # Волновая скорость зависит от глубины
-
-    def initial_wave(x, y, sources):
-        """Создание начальной волны из нескольких источников.
-
-        sources: список источников, где каждый источник — словарь с ключами:
-            - "x": координата X центра
-            - "y": координата Y центра
-            - "height": высота волны
-            - "width": ширина волны
-        """
-        wave = np.zeros_like(x)
-        for source in sources:
-            wave += source["height"] * np.exp(
-                -((x - source["x"]) ** 2 + (y - source["y"]) ** 2) / (2 * source["width"] ** 2)
-            )
-        return wave
-
-    eta = D0 + initial_wave(X, Y, sources)
-    eta_prev = eta.copy()
-    eta_next = np.zeros_like(eta)
-
-    # Настройка графиков
-    fig = plt.figure(figsize=(18, 8)) #10 5
-
-    # 2D график
-    ax2d = fig.add_subplot(121)
-    ax2d.set_xlim(0, L)
-    ax2d.set_ylim(0, L)
-    cax2d = ax2d.imshow(eta, cmap="viridis", vmin=0, vmax=D0 + max([source['height'] for source in sources]+[0]), origin="lower", extent=[0, L, 0, L])
-    fig.colorbar(cax2d, ax=ax2d, label="Высота волны")
-
-    # 3D график
-    ax3d = fig.add_subplot(122, projection='3d')
-    ax3d.set_zlim(0, D0 + max([source['height'] for source in sources]+[0]))
-    wave_surf = ax3d.plot_surface(X, Y, eta, cmap="viridis", edgecolor="k", alpha=0.8)
-    depth_surf = ax3d.plot_surface(X, Y, -D + D0, cmap="copper", edgecolor="none", alpha=0.6)
-
-    def update(frame):
-        nonlocal eta, eta_prev, eta_next, wave_surf
-
-        # Разностная схема для волнового уравнения
-        eta_next[1:-1, 1:-1] = (2 * eta[1:-1, 1:-1] - eta_prev[1:-1, 1:-1] +
-                                (dt**2 / dx**2) * (
-                                    c[1:-1, 1:-1]**2 * (
-                                        (eta[2:, 1:-1] - 2 * eta[1:-1, 1:-1] + eta[:-2, 1:-1]) +
-                                        (eta[1:-1, 2:] - 2 * eta[1:-1, 1:-1] + eta[1:-1, :-2])
-                                    )
-                                ))
-
-        # Условия Неймана (нулевой градиент на границах)
-        eta_next[0, 1:-1] = eta_next[1, 1:-1]  # Верхняя граница
-        eta_next[-1, 1:-1] = eta_next[-2, 1:-1]  # Нижняя граница
-        eta_next[1:-1, 0] = eta_next[1:-1, 1]  # Левая граница
-        eta_next[1:-1, -1] = eta_next[1:-1, -2]  # Правая граница
-        eta_next[0, 0] = eta_next[1, 1]  # Верхний левый угол
-        eta_next[0, -1] = eta_next[1, -2]  # Верхний правый угол
-        eta_next[-1, 0] = eta_next[-2, 1]  # Нижний левый угол
-        eta_next[-1, -1] = eta_next[-2, -2]  # Нижний правый угол
-
-        eta_prev, eta = eta, eta_next.copy()
-
-        cax2d.set_array(eta)
-
-        wave_surf.remove()
-        wave_surf = ax3d.plot_surface(X, Y, eta, cmap="viridis", edgecolor="k", alpha=0.8)
-
-        return cax2d, wave_surf, depth_surf
-
-    ani = FuncAnimation(fig, update, frames=t_steps, interval=50)
+    timer = PhaseTimer() if timings_var.get() else None
+    solver = build_solver(form_params(), sources, timer=timer)
+    L = (solver.x[-1], solver.y[-1])  # Размеры области; для дна из файла — по сетке файла
+    X, Y = np.meshgrid(solver.x, solver.y)
+    D = solver.D
+    eta = solver.state
+
+    t_steps = int(gif_time_var.get())  # Количество кадров
+    steps_per_frame = int(steps_per_frame_var.get())  # Шагов схемы на один кадр
+
+    zmax = D0 + max([source['height'] for source in sources]+[0])
+    resolution = int(surface_resolution_var.get())  # Узлов 3D-сетки по стороне
+
     if bool(save_gif_var.get()):
         now = datetime.datetime.now()
         timestamp = now.strftime("%Y%m%d_%H%M%S")
         filename = f"tsunami_wave_{timestamp}.gif"
-        ani.save(filename, writer="imagemagick", fps=25)
-        print(f"{timestamp} finished!")
+
+        def export():
+            export_animation(solver, filename, t_steps, steps_per_frame, fps=25, L=L, zmax=zmax, resolution=resolution)
+            print(f"{timestamp} finished!")
+            if timer:
+                print(timer.summary())
+
+        # Запись идёт в фоне, чтобы не блокировать форму
+        threading.Thread(target=export, daemon=True).start()
         return
-    else:
-        plt.show()
+
+    # Окно с расчётом в отдельном потоке; форма параметров остаётся доступной
+    def make_view(fig):
+        return WaveFigure(fig, X, Y, D, eta, L, D0, zmax, resolution=resolution,
+                          every=int(surface_every_var.get()))
+
+    def on_close(viewer):
+        if timer:
+            print(timer.summary())
+
+    LiveViewer(root, solver, make_view, t_steps, steps_per_frame, fps=20, on_close=on_close)
+
+
+# Интерфейс строится только при запуске файла, а не при импорте
+# (на Windows процессы записи анимации из export.py заново импортируют главный модуль)
+if __name__ == "__main__":
+    root = tk.Tk()
+    root.title("Настройка параметров симуляции")
+
+    depth_profile_var = tk.StringVar(value="Гора")
+
+    length_var = tk.StringVar(value="300")
+    depth_var = tk.StringVar(value="20")
+
+    hill_height_var = tk.StringVar(value="19")
+    hill_width_var = tk.StringVar(value="20")
+    hill_x_var = tk.StringVar(value="80")
+    hill_y_var = tk.StringVar(value="30")
+
+    multiplier_var = tk.StringVar(value="1")
+    speed_multiplier_var = tk.StringVar(value="1")
+    save_gif_var = tk.BooleanVar(value=False)
+    gif_time_var = tk.StringVar(value="1000")
+    courant_var = tk.StringVar(value="0.9")
+    steps_per_frame_var = tk.StringVar(value="1")
+    surface_resolution_var = tk.StringVar(value="60")
+    surface_every_var = tk.StringVar(value="1")
+    seed_var = tk.StringVar(value="0")
+    timings_var = tk.BooleanVar(value=False)
+    dtype_var = tk.StringVar(value="float64")
+    sponge_var = tk.StringVar(value="0")
+    order_var = tk.StringVar(value="2")
+    dx_var = tk.StringVar(value="5")
+    window_var = tk.StringVar(value="")
+    cellsize_var = tk.StringVar(value="")
+    bathymetry_var = tk.StringVar(value="")
+
+    ttk.Label(root, text="Тип профиля глубины:").grid(row=0, column=2, padx=5, pady=5)
+    ttk.OptionMenu(root, depth_profile_var, "Гора", "Гора", "Впадина", "Хребет", "Плато", "Случайный", "Многослойный", FILE_PROFILE).grid(row=0, column=3, padx=5, pady=5)
+
+    ttk.Label(root, text="Размер области (L):").grid(row=0, column=0, padx=5, pady=5)
+    ttk.Entry(root, textvariable=length_var).grid(row=0, column=1, padx=5, pady=5)
+
+    ttk.Label(root, text="Средняя глубина (D0):").grid(row=1, column=0, padx=5, pady=5)
+    ttk.Entry(root, textvariable=depth_var).grid(row=1, column=1, padx=5, pady=5)
+
+    ttk.Label(root, text="Высота горы:").grid(row=2, column=0, padx=5, pady=5)
+    ttk.Entry(root, textvariable=hill_height_var).grid(row=2, column=1, padx=5, pady=5)
+
+    ttk.Label(root, text="Ширина горы:").grid(row=3, column=0, padx=5, pady=5)
+    ttk.Entry(root, textvariable=hill_width_var).grid(row=3, column=1, padx=5, pady=5)
+
+    ttk.Label(root, text="X% горы:").grid(row=4, column=0, padx=5, pady=5)
+    ttk.Entry(root, textvariable=hill_x_var).grid(row=4, column=1, padx=5, pady=5)
+
+    ttk.Label(root, text="Y% Горы:").grid(row=5, column=0, padx=5, pady=5)
+    ttk.Entry(root, textvariable=hill_y_var).grid(row=5, column=1, padx=5, pady=5)
 
 
-root = tk.Tk()
-root.title("Настройка параметров симуляции")
+    ttk.Label(root, text="Множитель:").grid(row=6, column=0, padx=5, pady=5)
+    ttk.Entry(root, textvariable=multiplier_var).grid(row=6, column=1, padx=5, pady=5)
 
-depth_profile_var = tk.StringVar(value="Гора")
+    ttk.Label(root, text="Множитель скорости:").grid(row=7, column=0, padx=5, pady=5)
+    ttk.Entry(root, textvariable=speed_multiplier_var).grid(row=7, column=1, padx=5, pady=5)
 
-length_var = tk.StringVar(value="300")
-depth_var = tk.StringVar(value="20")
+    ttk.Label(root, text="Записать гифку?").grid(row=8, column=0, padx=5, pady=5)
+    ttk.Checkbutton(root, variable=save_gif_var).grid(row=8, column=1, padx=5, pady=5)
 
-hill_height_var = tk.StringVar(value="19")
-hill_width_var = tk.StringVar(value="20")
-hill_x_var = tk.StringVar(value="80")
-hill_y_var = tk.StringVar(value="30")
+    ttk.Label(root, text="Промежуток времени:").grid(row=9, column=0, padx=5, pady=5)
+    ttk.Entry(root, textvariable=gif_time_var).grid(row=9, column=1, padx=5, pady=5)
 
-multiplier_var = tk.StringVar(value="1")
-speed_multiplier_var = tk.StringVar(value="1")
-save_gif_var = tk.BooleanVar(value=False)
-gif_time_var = tk.StringVar(value="1000")
+    ttk.Label(root, text="Число Куранта:").grid(row=10, column=0, padx=5, pady=5)
+    ttk.Entry(root, textvariable=courant_var).grid(row=10, column=1, padx=5, pady=5)
 
-ttk.Label(root, text="Тип профиля глубины:").grid(row=0, column=2, padx=5, pady=5)
-ttk.OptionMenu(root, depth_profile_var, "Гора", "Гора", "Впадина", "Хребет", "Плато", "Случайный", "Многослойный").grid(row=0, column=3, padx=5, pady=5)
+    ttk.Label(root, text="Шагов на кадр:").grid(row=11, column=0, padx=5, pady=5)
+    ttk.Entry(root, textvariable=steps_per_frame_var).grid(row=11, column=1, padx=5, pady=5)
 
-ttk.Label(root, text="Размер области (L):").grid(row=0, column=0, padx=5, pady=5)
-ttk.Entry(root, textvariable=length_var).grid(row=0, column=1, padx=5, pady=5)
+    ttk.Label(root, text="Детализация 3D (узлов):").grid(row=12, column=0, padx=5, pady=5)
+    ttk.Entry(root, textvariable=surface_resolution_var).grid(row=12, column=1, padx=5, pady=5)
 
-ttk.Label(root, text="Средняя глубина (D0):").grid(row=1, column=0, padx=5, pady=5)
-ttk.Entry(root, textvariable=depth_var).grid(row=1, column=1, padx=5, pady=5)
+    ttk.Label(root, text="3D каждые N кадров:").grid(row=13, column=0, padx=5, pady=5)
+    ttk.Entry(root, textvariable=surface_every_var).grid(row=13, column=1, padx=5, pady=5)
 
-ttk.Label(root, text="Высота горы:").grid(row=2, column=0, padx=5, pady=5)
-ttk.Entry(root, textvariable=hill_height_var).grid(row=2, column=1, padx=5, pady=5)
+    ttk.Label(root, text="Зерно случайного дна:").grid(row=14, column=0, padx=5, pady=5)
+    ttk.Entry(root, textvariable=seed_var).grid(row=14, column=1, padx=5, pady=5)
 
-ttk.Label(root, text="Ширина горы:").grid(row=3, column=0, padx=5, pady=5)
-ttk.Entry(root, textvariable=hill_width_var).grid(row=3, column=1, padx=5, pady=5)
+    ttk.Label(root, text="Время по этапам:").grid(row=15, column=0, padx=5, pady=5)
+    ttk.Checkbutton(root, variable=timings_var).grid(row=15, column=1, padx=5, pady=5)
 
-ttk.Label(root, text="X% горы:").grid(row=4, column=0, padx=5, pady=5)
-ttk.Entry(root, textvariable=hill_x_var).grid(row=4, column=1, padx=5, pady=5)
+    ttk.Label(root, text="Точность расчёта:").grid(row=16, column=0, padx=5, pady=5)
+    ttk.OptionMenu(root, dtype_var, "float64", "float64", "float32").grid(row=16, column=1, padx=5, pady=5)
 
-ttk.Label(root, text="Y% Горы:").grid(row=5, column=0, padx=5, pady=5)
-ttk.Entry(root, textvariable=hill_y_var).grid(row=5, column=1, padx=5, pady=5)
+    ttk.Label(root, text="Поглощающий слой (узлов):").grid(row=17, column=0, padx=5, pady=5)
+    ttk.Entry(root, textvariable=sponge_var).grid(row=17, column=1, padx=5, pady=5)
 
+    # Дно из файла .npy или ESRI .asc, выбирается профилем "Из файла"
+    ttk.Button(root, text="Файл дна...", command=choose_bathymetry).grid(row=18, column=0, padx=5, pady=5)
+    ttk.Label(root, textvariable=bathymetry_var, width=30).grid(row=18, column=1, padx=5, pady=5)
 
-ttk.Label(root, text="Множитель:").grid(row=6, column=0, padx=5, pady=5)
-ttk.Entry(root, textvariable=multiplier_var).grid(row=6, column=1, padx=5, pady=5)
+    # Четвёртый порядок точнее на крупной сетке; лучше с числом Куранта около 0.5
+    ttk.Label(root, text="Порядок схемы:").grid(row=19, column=0, padx=5, pady=5)
+    ttk.OptionMenu(root, order_var, "2", "2", "4").grid(row=19, column=1, padx=5, pady=5)
 
-ttk.Label(root, text="Множитель скорости:").grid(row=7, column=0, padx=5, pady=5)
-ttk.Entry(root, textvariable=speed_multiplier_var).grid(row=7, column=1, padx=5, pady=5)
+    ttk.Label(root, text="Шаг сетки (dx):").grid(row=20, column=0, padx=5, pady=5)
+    ttk.Entry(root, textvariable=dx_var).grid(row=20, column=1, padx=5, pady=5)
 
-ttk.Label(root, text="Записать гифку?").grid(row=8, column=0, padx=5, pady=5)
-ttk.Checkbutton(root, variable=save_gif_var).grid(row=8, column=1, padx=5, pady=5)
+    # Для дна из файла: окно в ячейках и размер ячейки (пусто — весь файл, ячейка из заголовка .asc)
+    ttk.Label(root, text="Окно файла r0,r1,c0,c1:").grid(row=21, column=0, padx=5, pady=5)
+    ttk.Entry(root, textvariable=window_var).grid(row=21, column=1, padx=5, pady=5)
 
-ttk.Label(root, text="Промежуток времени:").grid(row=9, column=0, padx=5, pady=5)
-ttk.Entry(root, textvariable=gif_time_var).grid(row=9, column=1, padx=5, pady=5)
+    ttk.Label(root, text="Ячейка файла:").grid(row=22, column=0, padx=5, pady=5)
+    ttk.Entry(root, textvariable=cellsize_var).grid(row=22, column=1, padx=5, pady=5)
 
-ttk.Button(root, text="Рассчитать анимацию", command=run_simulation).grid(row=9, column=3, columnspan=3, pady=10)
+    ttk.Button(root, text="Рассчитать анимацию", command=run_simulation).grid(row=9, column=3, columnspan=3, pady=10)
 
 
-ttk.Label(root, text="X% источника:").grid(row=1, column=2, padx=5, pady=5)
-source_x_var = tk.StringVar(value="50")
-ttk.Entry(root, textvariable=source_x_var).grid(row=1, column=3, padx=5, pady=5)
+    ttk.Label(root, text="X% источника:").grid(row=1, column=2, padx=5, pady=5)
+    source_x_var = tk.StringVar(value="50")
+    ttk.Entry(root, textvariable=source_x_var).grid(row=1, column=3, padx=5, pady=5)
 
-ttk.Label(root, text="Y% источника:").grid(row=2, column=2, padx=5, pady=5)
-source_y_var = tk.StringVar(value="50")
-ttk.Entry(root, textvariable=source_y_var).grid(row=2, column=3, padx=5, pady=5)
+    ttk.Label(root, text="Y% источника:").grid(row=2, column=2, padx=5, pady=5)
+    source_y_var = tk.StringVar(value="50")
+    ttk.Entry(root, textvariable=source_y_var).grid(row=2, column=3, padx=5, pady=5)
 
-ttk.Label(root, text="Высота источника:").grid(row=3, column=2, padx=5, pady=5)
-source_height_var = tk.StringVar(value="40")
-ttk.Entry(root, textvariable=source_height_var).grid(row=3, column=3, padx=5, pady=5)
+    ttk.Label(root, text="Высота источника:").grid(row=3, column=2, padx=5, pady=5)
+    source_height_var = tk.StringVar(value="40")
+    ttk.Entry(root, textvariable=source_height_var).grid(row=3, column=3, padx=5, pady=5)
 
-ttk.Label(root, text="Ширина источника:").grid(row=4, column=2, padx=5, pady=5)
-source_width_var = tk.StringVar(value="10")
-ttk.Entry(root, textvariable=source_width_var).grid(row=4, column=3, padx=5, pady=5)
+    ttk.Label(root, text="Ширина источника:").grid(row=4, column=2, padx=5, pady=5)
+    source_width_var = tk.StringVar(value="10")
+    ttk.Entry(root, textvariable=source_width_var).grid(row=4, column=3, padx=5, pady=5)
 
-ttk.Button(root, text="Добавить источник", command=add_source).grid(row=4, column=4, columnspan=1, pady=5)
-ttk.Button(root, text="Очистить источники", command=clear_sources).grid(row=6, column=4, columnspan=1, pady=5)
+    ttk.Button(root, text="Добавить источник", command=add_source).grid(row=4, column=4, columnspan=1, pady=5)
+    ttk.Button(root, text="Очистить источники", command=clear_sources).grid(row=6, column=4, columnspan=1, pady=5)
 
-ttk.Label(root, text="Источники:").grid(row=5, column=2, padx=5, pady=5)
-sources_listbox = tk.Listbox(root, height=5, width=45)
-sources_listbox.grid(row=5, column=3, columnspan=2, padx=5, pady=5)
+    ttk.Label(root, text="Источники:").grid(row=5, column=2, padx=5, pady=5)
+    sources_listbox = tk.Listbox(root, height=5, width=45)
+    sources_listbox.grid(row=5, column=3, columnspan=2, padx=5, pady=5)
 
 
-root.mainloop()
+    root.mainloop()
@@ -2,118 +2,116 @@ import datetime
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
-from scipy.integrate import solve_ivp
 import tkinter as tk
-from tkinter import ttk
+from tkinter import filedialog, ttk
+
+from bathymetry import FILE_PROFILE, load_grid
+from eikonal import arrival_map
+from rays import AnalyticSeabed, GriddedSeabed, initial_fan, integrate_rays, integrate_rays_adaptive
+from render import RayRenderer
 
 # Параметры системы
-L = 100  # Размер области
+L0 = 100  # Размер области для профилей-формул
+Lx, Ly = L0, L0  # Размеры текущей области (для дна из файла — по сетке файла)
 g = 9.81  # Ускорение свободного падения
 D0 = 50  # Базовая глубина
 hill_height = 40
 hill_width = 20
-hill_x, hill_y = 50 / 100 * L, 50 / 100 * L  # Центр подводной структуры
-
-
-# Определение функции глубины
-def depth_profile(x, y, profile_type):
-    if profile_type == "Гора":
-        return D0 - hill_height * np.exp(-((x - hill_x) ** 2 + (y - hill_y) ** 2) / (2 * hill_width ** 2))
-    elif profile_type == "Впадина":
-        return D0 + hill_height * np.exp(-((x - hill_x) ** 2 + (y - hill_y) ** 2) / (2 * hill_width ** 2))
-    elif profile_type == "Хребет":
-        return D0 - hill_height * np.exp(-(x - hill_x) ** 2 / (2 * hill_width ** 2))
-    elif profile_type == "Плато":
-        return D0 - hill_height * (x / L) + 1
-    elif profile_type == "Случайный":
-        np.random.seed(0)
-        return D0 - hill_height * np.random.rand(*x.shape)
-    elif profile_type == "Многослойный":
-        layer_width = L / 10  # Ширина одного слоя
-        return D0 - hill_height * (np.floor(x / layer_width) % 2)
-
-
-# Градиенты глубины
-def depth_gradients(x, y, profile_type):
-    if profile_type == "Гора":
-        grad_x = -hill_height * (x - hill_x) * np.exp(
-            -((x - hill_x) ** 2 + (y - hill_y) ** 2) / (2 * hill_width ** 2)) / hill_width ** 2
-        grad_y = -hill_height * (y - hill_y) * np.exp(
-            -((x - hill_x) ** 2 + (y - hill_y) ** 2) / (2 * hill_width ** 2)) / hill_width ** 2
-    elif profile_type == "Впадина":
-        grad_x = hill_height * (x - hill_x) * np.exp(
-            -((x - hill_x) ** 2 + (y - hill_y) ** 2) / (2 * hill_width ** 2)) / hill_width ** 2
-        grad_y = hill_height * (y - hill_y) * np.exp(
-            -((x - hill_x) ** 2 + (y - hill_y) ** 2) / (2 * hill_width ** 2)) / hill_width ** 2
-    elif profile_type == "Хребет":
-        grad_x = -hill_height * (x - hill_x) * np.exp(-(x - hill_x) ** 2 / (2 * hill_width ** 2)) / hill_width ** 2
-        grad_y = 0
-    elif profile_type == "Плато":
-        grad_x = hill_height / L
-        grad_y = 0
-    else:
-        grad_x = grad_y = 0  # Для случайного и многослойного профиля градиенты не определены
-    return -grad_x, -grad_y
+hill_x, hill_y = 50 / 100 * L0, 50 / 100 * L0  # Центр подводной структуры
 
 
-# Скорость волны
-def wave_speed(x, y, profile_type):
-    return np.sqrt(g * depth_profile(x, y, profile_type))
+# Дно по параметрам формы
+def make_seabed():
+    global Lx, Ly, hill_height, hill_width, hill_x, hill_y
 
+    if profile_var.get() == FILE_PROFILE:
+        # Окно и ячейка файла — как в m2.py; сетка укрупняется до 400 узлов
+        # по стороне. На суше и за краем сетки скорость NaN, и лучи, вышедшие
+        # туда, останавливаются
+        window = [int(v) for v in window_var.get().split(",")] if window_var.get().strip() else None
+        cellsize = float(cellsize_var.get()) if cellsize_var.get().strip() else None
+        x, y, D = load_grid(bathymetry_var.get(), window=window, cellsize=cellsize, max_size=400)
+        Lx, Ly = x[-1], y[-1]
+        return GriddedSeabed(D, x, y, g, clip=False)
 
-# Уравнения Гамильтона
-def hamiltonian_system(t, z, profile_type):
-    x, y, px, py = z
-    c = wave_speed(x, y, profile_type)
+    Lx, Ly = L0, L0
+    hill_height = float(hill_height_var.get())
+    hill_width = float(hill_width_var.get())
+    hill_x = float(hill_x_var.get()) / 100 * L0
+    hill_y = float(hill_y_var.get()) / 100 * L0
 
-    dxdt = c * px / np.sqrt(px ** 2 + py ** 2)  # x' = ∂H/∂px
-    dydt = c * py / np.sqrt(px ** 2 + py ** 2)  # y' = ∂H/∂py
+    seabed = AnalyticSeabed(profile_var.get(), L0, D0, hill_height, hill_width, hill_x, hill_y, g)
+    if grid_var.get():
+        # Дно на сетке: градиенты есть у любого профиля, включая случайный и многослойный
+        seabed = GriddedSeabed.sample(seabed, L0, 200)
+    return seabed
 
-    grad_D_x, grad_D_y = depth_gradients(x, y, profile_type)
-    dp_x = -0.5 * g * grad_D_x  # px' = -∂H/∂x
-    dp_y = -0.5 * g * grad_D_y  # py' = -∂H/∂y
 
-    return [dxdt, dydt, dp_x, dp_y]
+# Карта времени первого прихода (метод быстрого марша)
+def show_arrival_map():
+    seabed = make_seabed()
+    x0 = float(x0_var.get()) / 100 * Lx
+    y0 = float(y0_var.get()) / 100 * Ly
+
+    x, y, T = arrival_map(seabed, (Lx, Ly), 200, x0, y0)
+    X, Y = np.meshgrid(x, y)
+
+    fig, ax = plt.subplots(figsize=(6, 6))
+    cmap = ax.imshow(D0 - seabed.depth(X, Y), extent=(0, Lx, 0, Ly), origin="lower", cmap="viridis", alpha=0.5)
+    fig.colorbar(cmap, ax=ax, label="Высота (м)")
+    contours = ax.contour(X, Y, T, levels=15, colors="black", linewidths=1)
+    ax.clabel(contours, fmt="%.1f с", fontsize=8)
+    ax.plot(x0, y0, "r*", markersize=10)
+    ax.set_title(f"Время прихода волны, профиль дна={profile_var.get()}")
+    ax.set_xlim(0, Lx)
+    ax.set_ylim(0, Ly)
+    ax.set_xlabel("x")
+    ax.set_ylabel("y")
+    plt.show()
+
+
+def choose_bathymetry():
+    path = filedialog.askopenfilename(title="Файл дна",
+                                      filetypes=[("Сетка глубин", "*.npy *.asc"), ("Все файлы", "*.*")])
+    if path:
+        bathymetry_var.set(path)
+        profile_var.set(FILE_PROFILE)
 
 
 # Функция запуска симуляции
 def run_simulation():
-    global hill_height, hill_width, hill_x, hill_y
-
-    hill_height = float(hill_height_var.get())
-    hill_width = float(hill_width_var.get())
-    hill_x = float(hill_x_var.get()) / 100 * L
-    hill_y = float(hill_y_var.get()) / 100 * L
+    seabed = make_seabed()
 
-    x0 = float(x0_var.get()) / 100 * L
-    y0 = float(y0_var.get()) / 100 * L
+    x0 = float(x0_var.get()) / 100 * Lx
+    y0 = float(y0_var.get()) / 100 * Ly
     radius = float(radius_var.get())
     profile_type = profile_var.get()
 
     save_animation = save_var.get()
 
-    num_directions = 150
-    angles = np.linspace(0, 2 * np.pi, num_directions, endpoint=False)
-    initial_conditions = [[x0, y0, radius * np.cos(angle), radius * np.sin(angle)] for angle in angles]
+    num_directions = int(num_rays_var.get())
+    initial_conditions = initial_fan(x0, y0, radius, num_directions)
 
     t_span = (0, 20)  # Временной интервал
     t_eval = np.linspace(t_span[0], t_span[1], 500)
 
-    # Решение уравнений Гамильтона
-    trajectories = []
-    for cond in initial_conditions:
-        sol = solve_ivp(hamiltonian_system, t_span, cond, t_eval=t_eval, args=(profile_type,), method='RK45')
-        trajectories.append(sol.y)
+    # Решение уравнений Гамильтона сразу для всех лучей
+    split = float(split_var.get())
+    if split > 0:
+        # Редкий веер, лучи добавляются между разошедшимися соседями
+        trajectories = integrate_rays_adaptive(initial_conditions, t_eval, seabed, split, extent=(0, Lx, 0, Ly))
+    else:
+        trajectories = integrate_rays(initial_conditions, t_eval, seabed)
 
     # Создание сетки для профиля глубины
-    x = np.linspace(0, L, 200)
-    y = np.linspace(0, L, 200)
+    x = np.linspace(0, Lx, 200)
+    y = np.linspace(0, Ly, 200)
     X, Y = np.meshgrid(x, y)
-    Z = D0 - depth_profile(X, Y, profile_type)
+    Z = D0 - seabed.depth(X, Y)
 
     # Настройка анимации
     fig, ax = plt.subplots(figsize=(6, 6))
-    cmap = ax.imshow(Z, extent=(0, L, 0, L), origin="lower", cmap="viridis", alpha=0.5)
+    cmap = ax.imshow(Z, extent=(0, Lx, 0, Ly), origin="lower", cmap="viridis", alpha=0.5)
     fig.colorbar(cmap, ax=ax, label="Высота (м)")
 
     initial_conditions_str = (f"Профиль дна={profile_type}\n"
@@ -123,18 +121,16 @@ def run_simulation():
                               f"Структура w={hill_width}, h={hill_height}")
     ax.set_title(initial_conditions_str)
 
-    ax.set_xlim(0, L)
-    ax.set_ylim(0, L)
+    ax.set_xlim(0, Lx)
+    ax.set_ylim(0, Ly)
     ax.set_xlabel("x")
     ax.set_ylabel("y")
 
-    # Анимация траекторий
-    lines = [ax.plot([], [], lw=1, color="black")[0] for _ in initial_conditions]
+    # Анимация траекторий: все лучи одной коллекцией и фронт волны
+    rays = RayRenderer(ax, trajectories)
 
     def update(frame):
-        for line, trajectory in zip(lines, trajectories):
-            line.set_data(trajectory[0, :frame], trajectory[1, :frame])
-        return lines
+        return rays.update(frame)
 
     ani = FuncAnimation(fig, update, frames=len(t_eval), interval=50, blit=True)
     if save_animation:
@@ -163,6 +159,12 @@ hill_x_var = tk.StringVar(value="50")
 hill_y_var = tk.StringVar(value="50")
 profile_var = tk.StringVar(value="Гора")
 save_var = tk.BooleanVar(value=False)
+num_rays_var = tk.StringVar(value="150")
+split_var = tk.StringVar(value="0")
+grid_var = tk.BooleanVar(value=False)
+bathymetry_var = tk.StringVar(value="")
+window_var = tk.StringVar(value="")
+cellsize_var = tk.StringVar(value="")
 
 # Метки и поля ввода
 # Начальные условия
@@ -192,15 +194,40 @@ ttk.Entry(frame, textvariable=hill_y_var).grid(row=6, column=1, padx=5, pady=5)
 # Тип профиля
 ttk.Label(frame, text="Тип профиля:").grid(row=7, column=0, padx=5, pady=5)
 ttk.Combobox(frame, textvariable=profile_var,
-             values=["Гора", "Впадина", "Хребет", "Плато", "Случайный", "Многослойный"], state="readonly").grid(row=7,
+             values=["Гора", "Впадина", "Хребет", "Плато", "Случайный", "Многослойный", FILE_PROFILE], state="readonly").grid(row=7,
                                                                                                                 column=1,
                                                                                                                 padx=5,
                                                                                                                 pady=5)
 
+# Количество лучей
+ttk.Label(frame, text="Количество лучей:").grid(row=8, column=0, padx=5, pady=5)
+ttk.Entry(frame, textvariable=num_rays_var).grid(row=8, column=1, padx=5, pady=5)
+
+# Дробление веера: наибольшее расстояние между соседними лучами (0 — без дробления)
+ttk.Label(frame, text="Дробить лучи дальше, чем:").grid(row=9, column=0, padx=5, pady=5)
+ttk.Entry(frame, textvariable=split_var).grid(row=9, column=1, padx=5, pady=5)
+
+# Чекбокс для дна на сетке
+ttk.Checkbutton(frame, text="Дно на сетке", variable=grid_var).grid(row=10, column=0, columnspan=2, pady=5)
+
 # Чекбокс для сохранения анимации
-ttk.Checkbutton(frame, text="Сохранить анимацию", variable=save_var).grid(row=8, column=0, columnspan=2, pady=5)
+ttk.Checkbutton(frame, text="Сохранить анимацию", variable=save_var).grid(row=11, column=0, columnspan=2, pady=5)
 
 # Кнопка запуска
-ttk.Button(frame, text="Запустить", command=run_simulation).grid(row=9, column=0, columnspan=2, pady=10)
+ttk.Button(frame, text="Запустить", command=run_simulation).grid(row=12, column=0, columnspan=2, pady=10)
+
+# Кнопка карты времени прихода
+ttk.Button(frame, text="Карта времени прихода", command=show_arrival_map).grid(row=13, column=0, columnspan=2, pady=5)
+
+# Дно из файла .npy или ESRI .asc (профиль "Из файла")
+ttk.Button(frame, text="Файл дна...", command=choose_bathymetry).grid(row=14, column=0, padx=5, pady=5)
+ttk.Label(frame, textvariable=bathymetry_var, width=30).grid(row=14, column=1, padx=5, pady=5)
+
+# Окно файла в ячейках и размер ячейки (пусто — весь файл, ячейка из заголовка .asc)
+ttk.Label(frame, text="Окно файла r0,r1,c0,c1:").grid(row=15, column=0, padx=5, pady=5)
+ttk.Entry(frame, textvariable=window_var).grid(row=15, column=1, padx=5, pady=5)
+
+ttk.Label(frame, text="Ячейка файла:").grid(row=16, column=0, padx=5, pady=5)
+ttk.Entry(frame, textvariable=cellsize_var).grid(row=16, column=1, padx=5, pady=5)
 
 root.mainloop()
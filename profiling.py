@@ -0,0 +1,112 @@
+"""Замер времени по этапам расчёта: схема, граница, источники, отрисовка, запись.
+
+    timer = PhaseTimer()
+    with timer.phase("stencil"):
+        ...
+    print(timer.summary())
+
+Когда замер не нужен, вместо PhaseTimer передаётся NULL_TIMER: его phase()
+возвращает один и тот же пустой контекст и ничего не считает.
+"""
+import time
+
+
+class _Phase:
+    """Контекст одного этапа; создаётся один раз на имя и переиспользуется."""
+
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class PhaseTimer:
+    """Суммарное время и число вызовов по этапам."""
+
+    enabled = True
+
+    def __init__(self):
+        self.totals = {}
+        self.counts = {}
+        self._phases = {}
+
+    def phase(self, name):
+        """Контекст, время которого добавляется к этапу name."""
+        phase = self._phases.get(name)
+        if phase is None:
+            phase = self._phases[name] = _Phase(self, name)
+        return phase
+
+    def add(self, name, seconds, count=1):
+        self.totals[name] = self.totals.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + count
+
+    def reset(self):
+        self.totals.clear()
+        self.counts.clear()
+
+    def report(self):
+        """Этапы в порядке убывания времени: {имя: {total, count, mean, share}}."""
+        whole = sum(self.totals.values()) or 1.0
+        return {
+            name: {
+                "total": total,
+                "count": self.counts[name],
+                "mean": total / self.counts[name],
+                "share": total / whole,
+            }
+            for name, total in sorted(self.totals.items(), key=lambda item: -item[1])
+        }
+
+    def summary(self):
+        """Таблица report() для вывода в консоль."""
+        lines = [f"{'Этап':12s} {'всего, с':>10s} {'вызовов':>9s} {'среднее, мс':>12s} {'доля':>6s}"]
+        for name, row in self.report().items():
+            lines.append(f"{name:12s} {row['total']:10.3f} {row['count']:9d} "
+                         f"{row['mean'] * 1000:12.3f} {row['share']:6.1%}")
+        return "\n".join(lines)
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class NullTimer:
+    """Заглушка PhaseTimer: ничего не замеряет и не хранит."""
+
+    enabled = False
+    _phase = _NullPhase()
+
+    def phase(self, name):
+        return self._phase
+
+    def add(self, name, seconds, count=1):
+        pass
+
+    def reset(self):
+        pass
+
+    def report(self):
+        return {}
+
+    def summary(self):
+        return ""
+
+
+NULL_TIMER = NullTimer()
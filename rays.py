@@ -0,0 +1,373 @@
+"""Лучевой метод для mmm.py без графики.
+
+Все лучи веера интегрируются вместе: состояние хранится массивом (4, N)
+из строк x, y, px, py, а шаг выбирается один на все лучи.
+
+    python rays.py --rays 5000 --profile Гора
+"""
+import argparse
+import time
+
+import numpy as np
+
+
+G = 9.81  # Ускорение свободного падения
+
+# Значения по умолчанию совпадают с mmm.py
+DEFAULT_SEABED = {
+    "L": 100,  # Размер области
+    "D0": 50,  # Базовая глубина
+    "hill_height": 40,
+    "hill_width": 20,
+    "hill_x": 50,  # Центр подводной структуры
+    "hill_y": 50,
+}
+
+
+class AnalyticSeabed:
+    """Профили дна mmm.py с аналитическими градиентами."""
+
+    def __init__(self, profile_type, L=100, D0=50, hill_height=40, hill_width=20, hill_x=50, hill_y=50, g=G):
+        self.profile_type = profile_type
+        self.L = L
+        self.D0 = D0
+        self.hill_height = hill_height
+        self.hill_width = hill_width
+        self.hill_x = hill_x
+        self.hill_y = hill_y
+        self.g = g
+
+    def depth(self, x, y):
+        """Функция глубины."""
+        profile_type = self.profile_type
+        if profile_type == "Гора":
+            return self.D0 - self.hill_height * self._bump(x, y)
+        elif profile_type == "Впадина":
+            return self.D0 + self.hill_height * self._bump(x, y)
+        elif profile_type == "Хребет":
+            return self.D0 - self.hill_height * np.exp(-(x - self.hill_x) ** 2 / (2 * self.hill_width ** 2))
+        elif profile_type == "Плато":
+            return self.D0 - self.hill_height * (x / self.L) + 1
+        elif profile_type == "Случайный":
+            return self.D0 - self.hill_height * np.random.default_rng(0).random(np.shape(x))
+        elif profile_type == "Многослойный":
+            layer_width = self.L / 10  # Ширина одного слоя
+            return self.D0 - self.hill_height * (np.floor(x / layer_width) % 2)
+        else:
+            raise ValueError("Неизвестный тип профиля!")
+
+    def gradients(self, x, y):
+        """Градиенты глубины (dD/dx, dD/dy)."""
+        profile_type = self.profile_type
+        w2 = self.hill_width ** 2
+        if profile_type in ("Гора", "Впадина"):
+            sign = 1 if profile_type == "Гора" else -1
+            bump = self._bump(x, y)
+            grad_x = sign * self.hill_height * (x - self.hill_x) * bump / w2
+            grad_y = sign * self.hill_height * (y - self.hill_y) * bump / w2
+        elif profile_type == "Хребет":
+            grad_x = self.hill_height * (x - self.hill_x) * np.exp(-(x - self.hill_x) ** 2 / (2 * w2)) / w2
+            grad_y = 0
+        elif profile_type == "Плато":
+            grad_x = -self.hill_height / self.L
+            grad_y = 0
+        else:
+            grad_x = grad_y = 0  # Для случайного и многослойного профиля градиенты не определены
+        return grad_x, grad_y
+
+    def speed(self, x, y):
+        """Скорость волны (NaN там, где глубина отрицательна)."""
+        with np.errstate(invalid="ignore"):
+            return np.sqrt(self.g * self.depth(x, y))
+
+    def speed_and_gradients(self, x, y):
+        """Скорость и градиенты глубины за один вызов."""
+        return (self.speed(x, y),) + self.gradients(x, y)
+
+    def _bump(self, x, y):
+        return np.exp(-((x - self.hill_x) ** 2 + (y - self.hill_y) ** 2) / (2 * self.hill_width ** 2))
+
+
+class GriddedSeabed:
+    """Дно, заданное на равномерной сетке, с заранее посчитанными градиентами.
+
+    Скорость и градиенты глубины в произвольных точках получаются билинейной
+    интерполяцией по таблицам, поэтому стоимость запроса не зависит от
+    сложности профиля. За пределами сетки значения берутся с ближайшего края,
+    а при clip=False получаются NaN, как на суше: лучи, вышедшие за сетку,
+    останавливаются (для дна из файла, за краем которого данных нет).
+    """
+
+    def __init__(self, D, x, y, g=G, clip=True):
+        """D — глубины формы (len(y), len(x)), x и y — равномерные координаты узлов
+        (например, solver.D, solver.x, solver.y из волнового решателя)."""
+        self.D = np.asarray(D, dtype=float)
+        self.clip = clip
+        self.x0, self.y0 = float(x[0]), float(y[0])
+        self.hx, self.hy = float(x[1] - x[0]), float(y[1] - y[0])
+        self.g = g
+        with np.errstate(invalid="ignore"):
+            self.c = np.sqrt(g * self.D)
+        self.grad_y, self.grad_x = np.gradient(self.D, self.hy, self.hx)
+
+    @classmethod
+    def sample(cls, seabed, L, n=200):
+        """Снять профиль seabed.depth на сетке n x n в квадрате [0, L]."""
+        x = np.linspace(0, L, n)
+        y = np.linspace(0, L, n)
+        X, Y = np.meshgrid(x, y)
+        return cls(seabed.depth(X, Y), x, y, g=seabed.g)
+
+    def depth(self, x, y):
+        return self._interpolate(self.D, *self._locate(x, y))
+
+    def gradients(self, x, y):
+        cell = self._locate(x, y)
+        return self._interpolate(self.grad_x, *cell), self._interpolate(self.grad_y, *cell)
+
+    def speed(self, x, y):
+        return self._interpolate(self.c, *self._locate(x, y))
+
+    def speed_and_gradients(self, x, y):
+        cell = self._locate(x, y)
+        return (self._interpolate(self.c, *cell), self._interpolate(self.grad_x, *cell),
+                self._interpolate(self.grad_y, *cell))
+
+    def _locate(self, x, y):
+        """Плоский индекс левого нижнего узла ячейки и доли внутри ячейки.
+
+        При clip=False доля для точек вне сетки — NaN, и интерполяция даёт NaN.
+        """
+        ny, nx = self.D.shape
+        rx = (np.asarray(x) - self.x0) / self.hx
+        ry = (np.asarray(y) - self.y0) / self.hy
+        fx = np.clip(np.nan_to_num(rx), 0, nx - 1)
+        fy = np.clip(np.nan_to_num(ry), 0, ny - 1)
+        i = np.minimum(fx.astype(int), nx - 2)
+        j = np.minimum(fy.astype(int), ny - 2)
+        tx = fx - i
+        if not self.clip:
+            # Допуск на округление: узлы на краю сетки (linspace до x[-1]) внутри
+            eps = 1e-9
+            outside = ~((rx >= -eps) & (rx <= nx - 1 + eps) & (ry >= -eps) & (ry <= ny - 1 + eps))
+            tx = np.where(outside, np.nan, tx)
+        return j * nx + i, tx, fy - j
+
+    @staticmethod
+    def _interpolate(field, corner, tx, ty):
+        nx = field.shape[1]
+        bottom = np.take(field, corner) * (1 - tx) + np.take(field, corner + 1) * tx
+        top = np.take(field, corner + nx) * (1 - tx) + np.take(field, corner + nx + 1) * tx
+        return bottom * (1 - ty) + top * ty
+
+
+def hamiltonian_rhs(z, seabed, out=None):
+    """Правая часть уравнений Гамильтона для массива лучей z формы (4, N)."""
+    x, y, px, py = z
+    if out is None:
+        out = np.empty_like(z)
+    c, grad_D_x, grad_D_y = seabed.speed_and_gradients(x, y)
+    norm = np.hypot(px, py)
+
+    out[0] = c * px / norm  # x' = ∂H/∂px
+    out[1] = c * py / norm  # y' = ∂H/∂py
+
+    out[2] = -0.5 * seabed.g * grad_D_x  # px' = -∂H/∂x
+    out[3] = -0.5 * seabed.g * grad_D_y  # py' = -∂H/∂y
+    return out
+
+
+def initial_fan(x0, y0, radius, num_directions):
+    """Веер лучей из точки (x0, y0) с равномерно распределёнными углами."""
+    angles = np.linspace(0, 2 * np.pi, num_directions, endpoint=False)
+    return np.array([np.full_like(angles, x0), np.full_like(angles, y0),
+                     radius * np.cos(angles), radius * np.sin(angles)])
+
+
+# Коэффициенты Дорманда — Принса (та же схема, что RK45 в solve_ivp).
+# Система автономна, поэтому узлы по времени c_i не нужны
+_DP_A = [
+    [],
+    [1 / 5],
+    [3 / 40, 9 / 40],
+    [44 / 45, -56 / 15, 32 / 9],
+    [19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729],
+    [9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656],
+]
+_DP_B = np.array([35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84])
+_DP_E = np.array([71 / 57600, 0, -71 / 16695, 71 / 1920, -17253 / 339200, 22 / 525, -1 / 40])
+
+
+def _rk4_step(z, h, rhs, k):
+    rhs(z, out=k[0])
+    rhs(z + 0.5 * h * k[0], out=k[1])
+    rhs(z + 0.5 * h * k[1], out=k[2])
+    rhs(z + h * k[2], out=k[3])
+    return z + h / 6 * (k[0] + 2 * k[1] + 2 * k[2] + k[3])
+
+
+def integrate_rays(z0, t_eval, seabed, method="RK45", rtol=1e-3, atol=1e-6, substeps=4):
+    """Проинтегрировать все лучи и вернуть траектории формы (4, N, len(t_eval)).
+
+    z0 — начальные состояния (4, N) в момент t_eval[0].
+    method="RK45" — схема Дорманда — Принса с общим для всех лучей выбором
+    шага по худшему лучу; method="RK4" — классическая схема с substeps
+    шагами между соседними точками t_eval.
+    """
+    z = np.array(z0, dtype=float)
+    t_eval = np.asarray(t_eval, dtype=float)
+    trajectories = np.empty(z.shape + (len(t_eval),))
+    trajectories[..., 0] = z
+
+    def rhs(state, out=None):
+        return hamiltonian_rhs(state, seabed, out)
+
+    k = np.empty((7,) + z.shape)
+    if method == "RK4":
+        for idx in range(1, len(t_eval)):
+            h = (t_eval[idx] - t_eval[idx - 1]) / substeps
+            for _ in range(substeps):
+                z = _rk4_step(z, h, rhs, k)
+            trajectories[..., idx] = z
+        return trajectories
+    if method != "RK45":
+        raise ValueError(f"Неизвестный метод: {method}")
+
+    t = t_eval[0]
+    h = t_eval[1] - t_eval[0] if len(t_eval) > 1 else 0
+    rhs(z, out=k[0])
+    for idx in range(1, len(t_eval)):
+        target = t_eval[idx]
+        while t < target:
+            h_try = min(h, target - t)
+            for stage in range(1, 6):
+                rhs(z + h_try * np.tensordot(_DP_A[stage], k[:stage], axes=1), out=k[stage])
+            z_new = z + h_try * np.tensordot(_DP_B, k[:6], axes=1)
+            rhs(z_new, out=k[6])
+
+            error = h_try * np.tensordot(_DP_E, k, axes=1)
+            scale = atol + rtol * np.maximum(np.abs(z), np.abs(z_new))
+            # Норма ошибки каждого луча; шаг общий, поэтому решает худший луч.
+            # Лучи, вышедшие на сушу (D < 0), дают NaN и в выборе шага не участвуют
+            ray_norm = np.sqrt(np.mean((error / scale) ** 2, axis=0))
+            ray_norm = ray_norm[np.isfinite(ray_norm)]
+            error_norm = ray_norm.max() if ray_norm.size else 0.0
+
+            if error_norm <= 1:
+                t += h_try
+                z = z_new
+                k[0] = k[6]
+            factor = 5 if error_norm == 0 else 0.9 * error_norm ** -0.2
+            h = h_try * min(5, max(0.2, factor))
+        trajectories[..., idx] = z
+    return trajectories
+
+
+def _split_gaps(z, max_separation, room, extent=None):
+    """Номера лучей-соседей и доли для вставки новых лучей между ними.
+
+    Лучи веера идут по кругу, поэтому последний сосед первого. Для пары на
+    расстоянии d вставляется ceil(d / max_separation) - 1 лучей, но всего не
+    больше room. При заданном extent = (xmin, xmax, ymin, ymax) пары, у
+    которых оба луча вне области, не дробятся.
+    """
+    n = z.shape[1]
+    gap = np.hypot(np.roll(z[0], -1) - z[0], np.roll(z[1], -1) - z[1])
+    split = np.isfinite(gap) & (gap > max_separation)
+    if extent is not None:
+        xmin, xmax, ymin, ymax = extent
+        inside = (z[0] >= xmin) & (z[0] <= xmax) & (z[1] >= ymin) & (z[1] <= ymax)
+        split &= inside | np.roll(inside, -1)
+    left, fractions = [], []
+    for i in np.flatnonzero(split):
+        count = min(int(np.ceil(gap[i] / max_separation)) - 1, room - len(left))
+        if count <= 0:
+            break
+        left.extend([i] * count)
+        fractions.extend(np.arange(1, count + 1) / (count + 1))
+    left = np.array(left, dtype=int)
+    return left, (left + 1) % n, np.array(fractions)
+
+
+def _interpolate_rays(a, b, w):
+    """Состояния между лучами a и b (массивы (4, k, ...)) с долями w.
+
+    Положение интерполируется линейно, у импульса — направление, а модуль
+    берётся средним, чтобы новый луч шёл с той же частотой.
+    """
+    pos = (1 - w) * a[:2] + w * b[:2]
+    p = (1 - w) * a[2:] + w * b[2:]
+    norm = (1 - w) * np.hypot(a[2], a[3]) + w * np.hypot(b[2], b[3])
+    length = np.hypot(p[0], p[1])
+    # Встречные импульсы (лучи по разные стороны луча-источника) — берём импульс a
+    p = np.where(length > 0, p * norm / np.where(length > 0, length, 1), a[2:])
+    return np.concatenate([pos, p])
+
+
+def integrate_rays_adaptive(z0, t_eval, seabed, max_separation, max_rays=2000, extent=None, **options):
+    """Веер с дроблением: между соседними лучами, разошедшимися дальше
+    max_separation, вставляются новые.
+
+    z0 — лучи (4, N), упорядоченные по углу (как у initial_fan). После каждой
+    точки t_eval проверяются расстояния между соседями; новый луч получает
+    состояние, интерполированное по соседям, и его прошлые точки траектории
+    заполняются так же. Всего лучей не больше max_rays. options передаются в
+    integrate_rays. Возвращает траектории (4, N_итог, len(t_eval)) в порядке
+    углов. extent ограничивает дробление областью (см. _split_gaps).
+    """
+    t_eval = np.asarray(t_eval, dtype=float)
+    z = np.array(z0, dtype=float)
+    trajectories = np.full(z.shape + (len(t_eval),), np.nan)
+    trajectories[..., 0] = z
+
+    for idx in range(1, len(t_eval)):
+        z = integrate_rays(z, t_eval[idx - 1:idx + 1], seabed, **options)[..., -1]
+        trajectories[..., idx] = z
+
+        left, right, w = _split_gaps(z, max_separation, max_rays - z.shape[1], extent)
+        if len(left) == 0:
+            continue
+        new = _interpolate_rays(trajectories[:, left], trajectories[:, right], w[:, None])
+        # Вставка после левого соседа; np.insert сохраняет порядок по углу
+        trajectories = np.insert(trajectories, left + 1, new, axis=1)
+        z = trajectories[..., idx]
+    return trajectories
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Лучевой расчёт без графики")
+    parser.add_argument("--rays", type=int, default=150, help="Количество лучей")
+    parser.add_argument("--profile", default="Гора", help="Тип профиля глубины")
+    parser.add_argument("--x0", type=float, default=20, help="Начальное x0 (%%)")
+    parser.add_argument("--y0", type=float, default=20, help="Начальное y0 (%%)")
+    parser.add_argument("--radius", type=float, default=9, help="Радиус импульса")
+    parser.add_argument("--t-end", type=float, default=20)
+    parser.add_argument("--samples", type=int, default=500, help="Точек на траектории")
+    parser.add_argument("--method", default="RK45", choices=["RK45", "RK4"])
+    parser.add_argument("--grid", type=int, help="Снять дно на сетке N x N и интерполировать")
+    parser.add_argument("--split", type=float, help="Дробить веер, если соседи разошлись дальше")
+    parser.add_argument("--max-rays", type=int, default=2000, help="Предел числа лучей при дроблении")
+    args = parser.parse_args(argv)
+
+    L = DEFAULT_SEABED["L"]
+    seabed = AnalyticSeabed(args.profile, **DEFAULT_SEABED)
+    if args.grid:
+        seabed = GriddedSeabed.sample(seabed, L, args.grid)
+    z0 = initial_fan(args.x0 / 100 * L, args.y0 / 100 * L, args.radius, args.rays)
+    t_eval = np.linspace(0, args.t_end, args.samples)
+
+    start = time.perf_counter()
+    if args.split:
+        trajectories = integrate_rays_adaptive(z0, t_eval, seabed, args.split, args.max_rays,
+                                               extent=(0, L, 0, L), method=args.method)
+    else:
+        trajectories = integrate_rays(z0, t_eval, seabed, method=args.method)
+    elapsed = time.perf_counter() - start
+    count = trajectories.shape[1]
+    print(f"{count} лучей, {args.samples} точек: {elapsed:.3f} с")
+    alive = np.isfinite(trajectories[0, :, -1])
+    print(f"Лучей, не вышедших на сушу: {alive.sum()} из {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Отрисовка поверхности волны для m2.py и test.py и лучей для mmm.py."""
+import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.colors import Normalize
+from matplotlib.path import Path
+from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+
+
+def decimation_indices(n, resolution):
+    """Индексы не более чем resolution узлов из n с равным шагом.
+
+    Последний узел всегда входит, чтобы поверхность доходила до края области.
+    """
+    stride = max(1, int(np.ceil((n - 1) / max(resolution - 1, 1))))
+    idx = np.arange(0, n, stride)
+    if idx[-1] != n - 1:
+        idx = np.append(idx, n - 1)
+    return idx
+
+
+class SurfaceRenderer:
+    """3D-поверхность волны на прореженной сетке.
+
+    В отличие от повторного вызова plot_surface, коллекция создаётся один раз,
+    а на каждом кадре в ней обновляются только z-координаты вершин и цвета.
+    """
+
+    def __init__(self, ax, X, Y, Z, resolution=60, every=1, cmap="viridis", vmin=None, vmax=None,
+                 edgecolor="k", alpha=0.8):
+        """resolution — не более стольких узлов по каждой стороне сетки;
+        every — обновлять поверхность только на каждом every-м кадре.
+        Если vmin и vmax не заданы, шкала цвета подстраивается под каждый кадр."""
+        ny, nx = Z.shape
+        rows = decimation_indices(ny, resolution)
+        cols = decimation_indices(nx, resolution)
+        self.every = max(1, int(every))
+        self.frame = 0
+
+        # Углы каждой ячейки прореженной сетки как плоские индексы исходной
+        R, C = np.meshgrid(rows, cols, indexing="ij")
+        flat = R * nx + C
+        self.corners = np.stack([flat[:-1, :-1], flat[1:, :-1], flat[1:, 1:], flat[:-1, 1:]],
+                                axis=-1).reshape(-1, 4)
+
+        self.verts = np.empty(self.corners.shape + (3,))
+        self.verts[..., 0] = np.take(X, self.corners)
+        self.verts[..., 1] = np.take(Y, self.corners)
+        self.z = np.empty(self.corners.shape)
+        self.z_mean = np.empty(len(self.corners))
+
+        self.autoscale = vmin is None and vmax is None
+        norm = Normalize(vmin=vmin, vmax=vmax)
+        self.surf = Poly3DCollection(self.verts, cmap=cmap, norm=norm, edgecolor=edgecolor, alpha=alpha)
+        ax.add_collection3d(self.surf)
+        ax.auto_scale_xyz(X, Y, Z, had_data=ax.has_data())
+        self._set_z(Z)
+
+    def update(self, Z):
+        """Обновить вершины по полю Z. Возвращает True, если кадр перерисован."""
+        self.frame += 1
+        if self.frame % self.every:
+            return False
+        self._set_z(Z)
+        return True
+
+    def _set_z(self, Z):
+        self.z[...] = np.take(Z, self.corners)  # Z может быть float32 (см. WaveSolver.dtype)
+        self.verts[..., 2] = self.z
+        self.surf.set_verts(self.verts)
+        # Цвет грани — по средней высоте, как в plot_surface
+        np.mean(self.z, axis=1, out=self.z_mean)
+        if self.autoscale:
+            self.surf.norm.autoscale(self.z_mean)
+        self.surf.set_array(self.z_mean)
+
+
+class WaveFigure:
+    """2D-карта и 3D-поверхность волны, как в окне m2.py.
+
+    fig — пустая фигура: plt.figure() для окна или matplotlib.figure.Figure
+    для отрисовки без интерфейса. L — размер области или пара (Lx, Ly).
+    """
+
+    def __init__(self, fig, X, Y, D, eta, L, rest_level, zmax, resolution=60, every=1):
+        Lx, Ly = L if isinstance(L, tuple) else (L, L)
+        # 2D график
+        ax2d = fig.add_subplot(121)
+        ax2d.set_xlim(0, Lx)
+        ax2d.set_ylim(0, Ly)
+        self.image = ax2d.imshow(eta, cmap="viridis", vmin=0, vmax=zmax, origin="lower", extent=[0, Lx, 0, Ly])
+        fig.colorbar(self.image, ax=ax2d, label="Высота волны")
+
+        # 3D график
+        ax3d = fig.add_subplot(122, projection='3d')
+        ax3d.set_zlim(0, zmax)
+        self.wave = SurfaceRenderer(ax3d, X, Y, eta, resolution=resolution, every=every,
+                                    cmap="viridis", edgecolor="k", alpha=0.8)
+        self.depth_surf = ax3d.plot_surface(X, Y, -D + rest_level, rcount=resolution, ccount=resolution,
+                                            cmap="copper", edgecolor="none", alpha=0.6)
+        self.fig = fig
+
+    def update(self, eta):
+        self.image.set_array(eta)
+        self.wave.update(eta)
+        return self.image, self.wave.surf, self.depth_surf
+
+
+def decimate_paths(x, y, pixel):
+    """Маска точек траекторий (N, T), которые видны при размере пикселя pixel.
+
+    Точка остаётся, если она отошла от последней оставленной точки своего
+    луча не меньше чем на pixel; первая и последняя (если она конечна) точки
+    остаются всегда. Выброшенные точки лежат ближе пикселя к оставленным, так
+    что ломаная по оставленным точкам на экране не отличается от полной.
+    """
+    keep = np.zeros(x.shape, dtype=bool)
+    keep[:, 0] = True
+    last_x, last_y = x[:, 0].copy(), y[:, 0].copy()
+    for k in range(1, x.shape[1]):
+        # Сравнение с NaN ложно: остановившийся луч больше не растёт
+        moved = np.hypot(x[:, k] - last_x, y[:, k] - last_y) >= pixel
+        keep[:, k] = moved
+        last_x[moved] = x[moved, k]
+        last_y[moved] = y[moved, k]
+    keep[:, -1] |= np.isfinite(x[:, -1]) & np.isfinite(y[:, -1])
+    return keep
+
+
+class RayRenderer:
+    """Лучи одной LineCollection и фронт волны, как в окне mmm.py.
+
+    trajectories — траектории (>= 2, N, T) из rays.integrate_rays. Точки
+    прореживаются один раз при создании (см. decimate_paths) и хранятся
+    одним массивом, луч за лучом; путь луча на кадре — срез этого массива,
+    поэтому кадр создаёт пути только у лучей, получивших новую точку.
+    Фронт — ломаная через положения лучей в текущий момент в порядке веера;
+    closed=True замыкает её, как у веера initial_fan по всей окружности.
+
+    pixel — размер пикселя в единицах данных; по умолчанию берётся из
+    текущих пределов осей и размера фигуры, поэтому пределы нужно задать
+    до создания.
+    """
+
+    def __init__(self, ax, trajectories, pixel=None, color="black", lw=1, front_color="red", front_lw=1.5,
+                 closed=True):
+        x, y = trajectories[0], trajectories[1]
+        if pixel is None:
+            box = ax.get_window_extent()
+            (x0, x1), (y0, y1) = ax.get_xlim(), ax.get_ylim()
+            pixel = max(abs(x1 - x0) / box.width, abs(y1 - y0) / box.height)
+        self.pixel = pixel
+        keep = decimate_paths(x, y, pixel)
+
+        # Оставленные точки всех лучей подряд и начало каждого луча в них
+        ray, step = np.nonzero(keep)
+        self.points = np.column_stack([x[ray, step], y[ray, step]])
+        self.start = np.concatenate([[0], np.cumsum(keep.sum(axis=1))[:-1]])
+        # Число видимых точек луча на каждом кадре
+        self.counts = np.cumsum(keep, axis=1, dtype=np.int32)
+        self.shown = np.zeros(len(self.start), dtype=np.int32)
+
+        self.x, self.y = x, y
+        self.closed = closed
+        self.lines = LineCollection([np.empty((0, 2))] * len(self.start), colors=color, linewidths=lw)
+        ax.add_collection(self.lines, autolim=False)
+        self.front, = ax.plot([], [], color=front_color, lw=front_lw)
+
+    def update(self, frame):
+        """Показать лучи до точки frame и фронт в этот момент."""
+        counts = self.counts[:, frame]
+        changed = np.flatnonzero(counts != self.shown)
+        if changed.size:
+            paths = self.lines.get_paths()  # Список путей коллекции, меняется на месте
+            for r in changed:
+                paths[r] = Path(self.points[self.start[r]:self.start[r] + counts[r]])
+            self.shown[changed] = counts[changed]
+            self.lines.stale = True
+
+        front_x, front_y = self.x[:, frame], self.y[:, frame]
+        if self.closed:
+            front_x, front_y = np.append(front_x, front_x[0]), np.append(front_y, front_y[0])
+        self.front.set_data(front_x, front_y)
+        return self.lines, self.front
@@ -0,0 +1,842 @@
+"""Волновой решатель без графики.
+
+Разностная схема та же, что и в m2.py, но вынесена в отдельный объект,
+который не зависит от matplotlib и tkinter. Пример запуска из консоли:
+
+    python solver.py --steps 1000 --source 50,50,40,10
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from bathymetry import FILE_PROFILE, default_cache, depth_profile, grid_extent, load_grid, make_grid
+from gauges import GaugeRecorder, parse_gauge
+from profiling import NULL_TIMER, PhaseTimer
+from store import Checkpointer, SnapshotStore
+
+
+G = 9.81  # Ускорение свободного падения
+
+# Значения по умолчанию совпадают с полями формы в m2.py
+DEFAULT_PARAMS = {
+    "profile": "Гора",
+    "L": 300,
+    "D0": 20,
+    "hill_height": 19,
+    "hill_width": 20,
+    "hill_x": 80,  # %
+    "hill_y": 30,  # %
+    "multiplier": 1,
+    "speed_multiplier": 1,
+    "dx": 5,
+    "dt": None,  # None — шаг выбирается по условию Куранта
+    "courant": 0.9,
+    "order": 2,  # Порядок аппроксимации лапласиана по пространству: 2 или 4
+    "seed": 0,  # Зерно для профиля "Случайный"
+    "dtype": "float64",  # Точность полей решателя: "float64" или "float32"
+    "sponge": 0,  # Ширина поглощающего слоя у краёв в узлах (0 — отражающие края)
+    "bathymetry": None,  # Файл дна .npy/.asc для профиля "Из файла"
+    "bathymetry_window": None,  # Окно файла [r0, r1, c0, c1] в ячейках
+    "bathymetry_cellsize": None,  # Размер ячейки файла; None — из заголовка .asc, для .npy 1
+    "bathymetry_max_size": None,  # Наибольшее число узлов по стороне для дна из файла
+}
+
+
+class SourceQueue:
+    """Источники в массивах, упорядоченные по времени включения.
+
+    Каждый источник — словарь с ключами:
+        - "x": координата X центра
+        - "y": координата Y центра
+        - "height": высота волны
+        - "width": ширина волны
+        - "delay": время включения в секундах (по умолчанию 0)
+    """
+
+    FIELDS = ("x", "y", "height", "width", "delay")
+
+    def __init__(self, sources):
+        sources = sorted(sources, key=lambda source: source.get("delay", 0))
+        for name in self.FIELDS:
+            setattr(self, name, np.array([source.get(name, 0) for source in sources], dtype=float))
+        self.next = 0  # Первый ещё не включённый источник
+
+    def __len__(self):
+        return len(self.delay) - self.next
+
+    def ready(self, t):
+        """Есть ли источники, время которых наступило к моменту t."""
+        return self.next < len(self.delay) and self.delay[self.next] <= t
+
+    def pop_due(self, t):
+        """Индексы источников, включающихся к моменту t."""
+        end = int(np.searchsorted(self.delay, t, side="right"))
+        due = range(self.next, end)
+        self.next = max(self.next, end)
+        return due
+
+    def remaining(self):
+        """Невключённые источники в виде словарей (для контрольной точки)."""
+        return [{name: float(getattr(self, name)[i]) for name in self.FIELDS}
+                for i in range(self.next, len(self.delay))]
+
+
+def stamp_source(fields, x, y, x0, y0, height, width, reach=4, prev=None, coef=None, dx=1.0):
+    """Добавить гауссов источник к каждому массиву из fields.
+
+    Гауссиана раскладывается на произведение множителей по x и по y и
+    считается только в окне +-reach*width вокруг центра.
+
+    prev — слой предыдущего шага, если источник стартует с нулевой скоростью.
+    В него добавляется eta(t - dt) = eta + (c*dt)^2/2 * lap(eta) со вторым
+    порядком по dt (при одинаковых слоях ошибка начальной скорости даёт
+    только первый порядок сходимости); coef = (c*dt/dx)^2 — коэффициент схемы.
+    """
+    i0, i1 = np.searchsorted(x, [x0 - reach * width, x0 + reach * width], side="right")
+    j0, j1 = np.searchsorted(y, [y0 - reach * width, y0 + reach * width], side="right")
+    i0, j0 = max(i0 - 1, 0), max(j0 - 1, 0)
+    gx = np.exp(-(x[i0:i1] - x0) ** 2 / (2 * width ** 2))
+    gy = np.exp(-(y[j0:j1] - y0) ** 2 / (2 * width ** 2))
+    wave = height * np.outer(gy, gx)
+    for field in fields:
+        field[j0:j1, i0:i1] += wave
+    if prev is not None:
+        # Лапласиан гауссианы: (r^2/width^2 - 2) / width^2 * wave
+        r2 = np.add.outer((y[j0:j1] - y0) ** 2, (x[i0:i1] - x0) ** 2) / width ** 2
+        prev[j0:j1, i0:i1] += wave * (1 + coef[j0:j1, i0:i1] * (dx / width) ** 2 * (r2 - 2) / 2)
+    return j0, j1, i0, i1
+
+
+# Предел max(c)*dt/dx устойчивости схемы для каждого порядка лапласиана
+STABILITY_LIMIT = {2: 1 / np.sqrt(2), 4: np.sqrt(3 / 8)}
+
+# Активная область (см. WaveSolver): порог |eta - D0| в метрах и число шагов
+# между пересчётами прямоугольника
+ACTIVE_TOL = 1e-6
+ACTIVE_EVERY = 10
+
+
+def stable_dt(c, dx, courant=0.9, order=2):
+    """Шаг по времени из условия Куранта.
+
+    Пятиточечная схема (order=2) устойчива при max(c)*dt/dx <= 1/sqrt(2),
+    схема четвёртого порядка — при max(c)*dt/dx <= sqrt(3/8); courant —
+    доля от этого предела (0 < courant <= 1).
+    """
+    if not 0 < courant <= 1:
+        raise ValueError("Число Куранта должно быть в интервале (0, 1]!")
+    if order not in STABILITY_LIMIT:
+        raise ValueError("Порядок схемы должен быть 2 или 4!")
+    return courant * STABILITY_LIMIT[order] * dx / np.max(c)
+
+
+def stencil_step(eta, eta_prev, out, coef, scratch):
+    """Один шаг схемы во внутренних узлах без временных массивов.
+
+    out = 2*eta - eta_prev + coef * lap(eta), где coef = (c*dt/dx)^2.
+    scratch — буфер формы eta[..., 1:-1, 1:-1]. Граничные узлы out не трогаются.
+    """
+    center = eta[..., 1:-1, 1:-1]
+    res = out[..., 1:-1, 1:-1]
+
+    # Сумма четырёх соседей
+    np.add(eta[..., 2:, 1:-1], eta[..., :-2, 1:-1], out=scratch)
+    np.add(scratch, eta[..., 1:-1, 2:], out=scratch)
+    np.add(scratch, eta[..., 1:-1, :-2], out=scratch)
+
+    # Лапласиан, умноженный на коэффициент
+    np.multiply(center, 4, out=res)
+    np.subtract(scratch, res, out=scratch)
+    np.multiply(scratch, coef[..., 1:-1, 1:-1], out=scratch)
+
+    np.multiply(center, 2, out=res)
+    np.subtract(res, eta_prev[..., 1:-1, 1:-1], out=res)
+    np.add(res, scratch, out=res)
+    return out
+
+
+def stencil_step4(eta, eta_prev, out, coef, scratch):
+    """Шаг схемы с лапласианом четвёртого порядка в узлах не ближе двух от края.
+
+    lap(eta) = (16*(ближние соседи) - (соседи через узел) - 60*eta) / 12 по
+    четырём направлениям. scratch — буфер формы eta[..., 2:-2, 2:-2]. Две
+    крайние строки и два крайних столбца out не трогаются.
+    """
+    center = eta[..., 2:-2, 2:-2]
+    res = out[..., 2:-2, 2:-2]
+
+    # Ближние соседи с весом 16
+    np.add(eta[..., 3:-1, 2:-2], eta[..., 1:-3, 2:-2], out=scratch)
+    np.add(scratch, eta[..., 2:-2, 3:-1], out=scratch)
+    np.add(scratch, eta[..., 2:-2, 1:-3], out=scratch)
+    np.multiply(scratch, 16, out=scratch)
+
+    # Соседи через узел с весом -1
+    np.subtract(scratch, eta[..., 4:, 2:-2], out=scratch)
+    np.subtract(scratch, eta[..., :-4, 2:-2], out=scratch)
+    np.subtract(scratch, eta[..., 2:-2, 4:], out=scratch)
+    np.subtract(scratch, eta[..., 2:-2, :-4], out=scratch)
+
+    # Лапласиан, умноженный на коэффициент
+    np.multiply(center, 60, out=res)
+    np.subtract(scratch, res, out=scratch)
+    np.multiply(scratch, coef[..., 2:-2, 2:-2], out=scratch)
+    np.divide(scratch, 12, out=scratch)
+
+    np.multiply(center, 2, out=res)
+    np.subtract(res, eta_prev[..., 2:-2, 2:-2], out=res)
+    np.add(res, scratch, out=res)
+    return out
+
+
+def wave_step(eta, eta_prev, out, coef, scratch, region, order=2):
+    """Шаг схемы порядка order для внутренних узлов region = (r0, r1, c0, c1).
+
+    Окна массивов берутся с гало в order/2 узла вокруг region. При order=4
+    узлы, соседние с краем сетки, считаются пятиточечной схемой: для
+    четвёртого порядка им не хватает второго ряда соседей. scratch — буфер
+    внутренних узлов eta[..., 1:-1, 1:-1].
+    """
+    r0, r1, c0, c1 = region
+    if order == 2:
+        window = (Ellipsis, slice(r0 - 1, r1 + 1), slice(c0 - 1, c1 + 1))
+        stencil_step(eta[window], eta_prev[window], out[window], coef[window],
+                     scratch[..., r0 - 1:r1 - 1, c0 - 1:c1 - 1])
+        return out
+
+    ny, nx = eta.shape[-2:]
+    a0, a1, b0, b1 = max(r0, 2), min(r1, ny - 2), max(c0, 2), min(c1, nx - 2)
+    if a0 < a1 and b0 < b1:
+        window = (Ellipsis, slice(a0 - 2, a1 + 2), slice(b0 - 2, b1 + 2))
+        stencil_step4(eta[window], eta_prev[window], out[window], coef[window],
+                      scratch[..., a0 - 1:a1 - 1, b0 - 1:b1 - 1])
+    # Соседние с краем узлы — те же полосы, что у поглощающего слоя в один узел
+    for s0, s1, t0, t1 in sponge_strips((ny, nx), 1):
+        rim = max(s0, r0), min(s1, r1), max(t0, c0), min(t1, c1)
+        if rim[0] < rim[1] and rim[2] < rim[3]:
+            wave_step(eta, eta_prev, out, coef, scratch, rim)
+    return out
+
+
+def neumann_boundary(eta):
+    """Условия Неймана (нулевой градиент на границах)."""
+    eta[..., 0, 1:-1] = eta[..., 1, 1:-1]  # Верхняя граница
+    eta[..., -1, 1:-1] = eta[..., -2, 1:-1]  # Нижняя граница
+    eta[..., 1:-1, 0] = eta[..., 1:-1, 1]  # Левая граница
+    eta[..., 1:-1, -1] = eta[..., 1:-1, -2]  # Правая граница
+    eta[..., 0, 0] = eta[..., 1, 1]  # Верхний левый угол
+    eta[..., 0, -1] = eta[..., 1, -2]  # Верхний правый угол
+    eta[..., -1, 0] = eta[..., -2, 1]  # Нижний левый угол
+    eta[..., -1, -1] = eta[..., -2, -2]  # Нижний правый угол
+    return eta
+
+
+def region_boundary(eta, r0, r1, c0, c1):
+    """Условия Неймана для узлов, обновлённых в строках r0..r1-1 и столбцах c0..c1-1.
+
+    Граничные строки и столбцы копируются только там, где область касается
+    края сетки; для всей внутренней области совпадает с neumann_boundary.
+    """
+    ny, nx = eta.shape[-2:]
+    top, bottom, left, right = r0 == 1, r1 == ny - 1, c0 == 1, c1 == nx - 1
+    if top:
+        eta[..., 0, c0:c1] = eta[..., 1, c0:c1]  # Верхняя граница
+    if bottom:
+        eta[..., -1, c0:c1] = eta[..., -2, c0:c1]  # Нижняя граница
+    if left:
+        eta[..., r0:r1, 0] = eta[..., r0:r1, 1]  # Левая граница
+    if right:
+        eta[..., r0:r1, -1] = eta[..., r0:r1, -2]  # Правая граница
+    if top and left:
+        eta[..., 0, 0] = eta[..., 1, 1]  # Верхний левый угол
+    if top and right:
+        eta[..., 0, -1] = eta[..., 1, -2]  # Верхний правый угол
+    if bottom and left:
+        eta[..., -1, 0] = eta[..., -2, 1]  # Нижний левый угол
+    if bottom and right:
+        eta[..., -1, -1] = eta[..., -2, -2]  # Нижний правый угол
+    return eta
+
+
+def sponge_strips(shape, width):
+    """Непересекающиеся прямоугольники (r0, r1, c0, c1) поглощающего слоя у краёв."""
+    ny, nx = shape
+    inner = width + 1
+    return [
+        (1, inner, 1, nx - 1),  # Верхняя полоса
+        (ny - inner, ny - 1, 1, nx - 1),  # Нижняя полоса
+        (inner, ny - inner, 1, inner),  # Левая полоса
+        (inner, ny - inner, nx - inner, nx - 1),  # Правая полоса
+    ]
+
+
+def box_difference(outer, inner):
+    """Непересекающиеся прямоугольники, покрывающие outer без inner.
+
+    Прямоугольники задаются как (r0, r1, c0, c1); inner=None — пустой.
+    """
+    r0, r1, c0, c1 = outer
+    if inner is None:
+        return [outer]
+    a0, a1, b0, b1 = max(inner[0], r0), min(inner[1], r1), max(inner[2], c0), min(inner[3], c1)
+    if a0 >= a1 or b0 >= b1:
+        return [outer]
+    parts = [(r0, a0, c0, c1), (a1, r1, c0, c1), (a0, a1, c0, b0), (a0, a1, b1, c1)]
+    return [(p0, p1, q0, q1) for p0, p1, q0, q1 in parts if p0 < p1 and q0 < q1]
+
+
+def sponge_damping(shape, width, sigma_max, dt):
+    """Множитель a = sigma*dt/2 в каждом узле поглощающего слоя.
+
+    sigma растёт квадратично от нуля на внутренней границе слоя шириной
+    width узлов до sigma_max на краю сетки; вне слоя a = 0.
+    """
+    ny, nx = shape
+    j, i = np.arange(ny), np.arange(nx)
+    depth_y = np.maximum(width - np.minimum(j, ny - 1 - j), 0) / width
+    depth_x = np.maximum(width - np.minimum(i, nx - 1 - i), 0) / width
+    depth = np.maximum.outer(depth_y, depth_x)
+    return sigma_max * depth ** 2 * dt / 2
+
+
+def apply_sponge(out, prev, gain, blend, strips, region, scratch):
+    """Затухание в поглощающем слое: out = (out + a*prev) / (1 + a).
+
+    Это схема для eta_tt + sigma*eta_t = c^2*lap(eta) с центральной
+    разностью по времени; gain = 1/(1+a), blend = a/(1+a). Обрабатываются
+    только части полос strips внутри обновлённой области region; scratch —
+    буфер внутренних узлов, как у stencil_step. Как и схема, работает по
+    последним двум осям (gain и blend — двумерные).
+    """
+    r0, r1, c0, c1 = region
+    for s0, s1, t0, t1 in strips:
+        a0, a1, b0, b1 = max(s0, r0), min(s1, r1), max(t0, c0), min(t1, c1)
+        if a0 >= a1 or b0 >= b1:
+            continue
+        window = (slice(a0, a1), slice(b0, b1))
+        res = out[(Ellipsis,) + window]
+        tmp = scratch[..., a0 - 1:a1 - 1, b0 - 1:b1 - 1]
+        np.multiply(res, gain[window], out=res)
+        np.multiply(prev[(Ellipsis,) + window], blend[window], out=tmp)
+        np.add(res, tmp, out=res)
+    return out
+
+
+class WaveSolver:
+    """Явная схема для волнового уравнения eta_tt = c^2 * (eta_xx + eta_yy).
+
+    Использование:
+        solver = WaveSolver(dx=5, rest_level=D0)
+        solver.init(D, sources, x, y)
+        solver.step(100)
+        eta = solver.state
+
+    sponge — ширина поглощающего слоя у краёв в узлах (0 — только условия
+    Неймана, волны отражаются от краёв); sponge_strength — безразмерная
+    сила затухания: sigma_max = sponge_strength * max(c) / (sponge * dx).
+
+    order — порядок лапласиана: 2 (пятиточечная схема) или 4 (девять
+    точек, крест шириной пять узлов). Шаг четвёртого порядка почти вдвое
+    дороже на узел, зато та же ошибка достигается на сетке в 2-3 раза
+    крупнее по каждой оси, если взять число Куранта около 0.5: иначе ошибку
+    задаёт второй порядок схемы по времени (см. check_convergence в bench.py).
+
+    При active_region=True схема считается только в прямоугольнике узлов,
+    где |eta - D0| > active_tol в одном из двух последних слоёв, с запасом
+    ceil(max(c)*dt/dx) * active_every узлов: за active_every шагов волна
+    дальше не уйдёт. Прямоугольник пересчитывается раз в active_every шагов
+    и сжимается вслед за уходящей волной, освободившиеся узлы возвращаются
+    на уровень покоя. Отличие от расчёта по всей сетке порядка active_tol.
+
+    При active_tol=0 область точная: в неё входят все узлы, отличные от
+    уровня покоя, и результат совпадает с расчётом по всей сетке бит в бит.
+    Но шаблон за шаг разносит ничтожные значения на order/2 узла, быстрее
+    волны, поэтому точная область растёт с этой скоростью, не сжимается и
+    на длинном расчёте быстро занимает всю сетку.
+    """
+
+    def __init__(self, dx=5, dt=None, speed_multiplier=1.0, rest_level=0.0, g=G, workers=1, courant=0.9,
+                 timer=None, active_region=True, dtype=np.float64, sponge=0, sponge_strength=5.0, order=2,
+                 active_tol=ACTIVE_TOL, active_every=ACTIVE_EVERY):
+        self.dx = dx
+        self.dt = dt  # None — выбрать по условию Куранта в init()
+        self.auto_dt = dt is None
+        self.courant = courant
+        self.speed_multiplier = speed_multiplier
+        self.rest_level = rest_level  # Уровень невозмущённой поверхности
+        self.g = g
+        self.workers = workers  # Число потоков; 1 — последовательный расчёт
+        self._pool = None
+        self.observers = []  # Вызываются после каждого шага: fn(solver)
+        self.timer = timer or NULL_TIMER  # Замер времени по этапам (см. profiling.py)
+        self.active_region = active_region
+        self.active_tol = active_tol  # 0 — точная область, без порога
+        self.active_every = active_every
+        # Тип полей D, c, coef и слоёв eta; float32 вдвое сокращает память и
+        # трафик схемы, а ошибка округления много меньше ошибки аппроксимации
+        self.dtype = np.dtype(dtype)
+        self.sponge = int(sponge)
+        self.sponge_strength = sponge_strength
+        if order not in STABILITY_LIMIT:
+            raise ValueError("Порядок схемы должен быть 2 или 4!")
+        self.order = order
+
+    def init(self, bathymetry, sources, x=None, y=None, c=None, coef=None):
+        """Подготовка сетки и начального состояния.
+
+        bathymetry: двумерный массив глубин D.
+        sources: список источников (см. SourceQueue).
+        x, y: координаты узлов; по умолчанию узлы идут с шагом dx от нуля.
+        c, coef: заранее посчитанные скорость и коэффициент схемы (из кэша);
+            coef должен соответствовать dt решателя.
+        Поля приводятся к типу self.dtype, координаты остаются float64.
+        """
+        D = np.asarray(bathymetry, dtype=self.dtype)
+        ny, nx = D.shape
+        self.x = np.arange(nx) * self.dx if x is None else np.asarray(x, dtype=float)
+        self.y = np.arange(ny) * self.dx if y is None else np.asarray(y, dtype=float)
+
+        self.D = D
+        if c is None:
+            c = self.speed_multiplier * np.sqrt(self.g * D)  # Волновая скорость зависит от глубины
+        self.c = np.asarray(c, dtype=self.dtype)
+        if self.auto_dt:
+            self.dt = stable_dt(self.c, self.dx, self.courant, self.order)
+        if coef is None:
+            coef = (self.c * self.dt / self.dx) ** 2  # Коэффициент схемы, считается один раз
+        self.coef = np.asarray(coef, dtype=self.dtype)
+        self._init_sponge()
+        self._init_margin()
+
+        self.n = 0
+        self.t = 0.0
+        self.sources = [dict(source, delay=source.get("delay", 0)) for source in sources]
+        self.queue = SourceQueue(self.sources)
+
+        self.eta = np.full_like(D, self.rest_level)
+        self.eta_prev = np.full_like(D, self.rest_level)
+        # Прямоугольник (r0, r1, c0, c1), вне которого поверхность в покое;
+        # None — покоится вся поверхность
+        self.active = None if self.active_region else (0, ny, 0, nx)
+        self._inject()
+        # Вне активной области узлы не обновляются и должны оставаться в покое
+        self.eta_next = np.full_like(self.eta, self.rest_level)
+        self.scratch = np.empty_like(self.eta[1:-1, 1:-1])
+
+        if self.workers > 1 and self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        return self
+
+    def close(self):
+        """Остановить пул потоков."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    @property
+    def state(self):
+        """Текущее поле высоты поверхности.
+
+        Буферы временных слоёв переиспользуются, поэтому массив будет
+        перезаписан через два шага; для хранения нужна копия.
+        """
+        return self.eta
+
+    def step(self, n=1):
+        """Сделать n шагов по времени."""
+        for _ in range(n):
+            self._step()
+        return self.eta
+
+    @property
+    def active_fraction(self):
+        """Доля узлов сетки в активной области."""
+        if self.active is None:
+            return 0.0
+        r0, r1, c0, c1 = self.active
+        return (r1 - r0) * (c1 - c0) / self.eta.size
+
+    def _update_region(self):
+        """Внутренние узлы (r0, r1, c0, c1), которые нужно считать на этом шаге."""
+        ny, nx = self.eta.shape
+        if not self.active_region:
+            return 1, ny - 1, 1, nx - 1
+        r0, r1, c0, c1 = self.active
+        # Точная область растёт на столько узлов, на сколько за шаг
+        # дотягивается шаблон; пороговая уже включает запас на active_every шагов
+        halo = 0 if self.active_tol else self.order // 2
+        return max(r0 - halo, 1), min(r1 + halo, ny - 1), max(c0 - halo, 1), min(c1 + halo, nx - 1)
+
+    def _step(self):
+        timer = self.timer
+        if self.active is not None:
+            r0, r1, c0, c1 = region = self._update_region()
+            if self._pool is None:
+                with timer.phase("stencil"):
+                    self._step_band(region)
+            else:
+                # Полосы строк области; потоки пишут в непересекающиеся строки
+                # eta_next, соседние строки служат гало, numpy отпускает GIL
+                edges = np.linspace(r0, r1, min(self.workers, r1 - r0) + 1).astype(int)
+                bands = [(a, b, c0, c1) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+                with timer.phase("stencil"):
+                    list(self._pool.map(self._step_band, bands))
+            if self.sponge_strips:
+                with timer.phase("sponge"):
+                    apply_sponge(self.eta_next, self.eta_prev, self.sponge_gain, self.sponge_blend,
+                                 self.sponge_strips, region, self.scratch)
+            with timer.phase("boundary"):
+                region_boundary(self.eta_next, *region)
+
+            if self.active_region and not self.active_tol:
+                # Граничные узлы копируют соседей, поэтому область, дошедшая до
+                # предпоследней строки или столбца, захватывает и край
+                ny, nx = self.eta.shape
+                self.active = (0 if r0 == 1 else r0, ny if r1 == ny - 1 else r1,
+                               0 if c0 == 1 else c0, nx if c1 == nx - 1 else c1)
+
+        # Поворот трёх временных слоёв без копирования
+        self.eta_prev, self.eta, self.eta_next = self.eta, self.eta_next, self.eta_prev
+
+        self.n += 1
+        self.t = self.n * self.dt
+        with timer.phase("sources"):
+            self._inject()
+        if self.active_region and self.active_tol and self.n % self.active_every == 0:
+            with timer.phase("region"):
+                self._refresh_active()
+
+        if self.observers:
+            with timer.phase("observers"):
+                for observer in self.observers:
+                    observer(self)
+
+    def _step_band(self, band):
+        """Шаг схемы для узлов [r0, r1) x [c0, c1) с гало в order/2 узла вокруг."""
+        wave_step(self.eta, self.eta_prev, self.eta_next, self.coef, self.scratch, band, self.order)
+
+    def _find_active(self, box):
+        """Прямоугольник узлов box, где |eta - D0| > active_tol в eta или eta_prev."""
+        r0, r1, c0, c1 = box
+        rest = self.eta.dtype.type(self.rest_level)  # Уровень покоя в точности полей
+        moved = None
+        for layer in (self.eta, self.eta_prev):
+            d = np.abs(layer[r0:r1, c0:c1] - rest) > self.active_tol
+            moved = d if moved is None else moved | d
+        rows = np.flatnonzero(moved.any(axis=1))
+        if rows.size == 0:
+            return None
+        cols = np.flatnonzero(moved.any(axis=0))
+        return r0 + int(rows[0]), r0 + int(rows[-1]) + 1, c0 + int(cols[0]), c0 + int(cols[-1]) + 1
+
+    def _grow(self, box):
+        """Прямоугольник box с запасом self.margin узлов, в пределах сетки."""
+        ny, nx = self.eta.shape
+        m = self.margin
+        r0, r1, c0, c1 = box
+        return max(r0 - m, 0), min(r1 + m, ny), max(c0 - m, 0), min(c1 + m, nx)
+
+    def _refresh_active(self):
+        """Пересчитать активную область по порогу и вернуть в покой узлы вне её."""
+        if self.active is None:
+            return
+        old = self.active
+        found = self._find_active(old)
+        self.active = None if found is None else self._grow(found)
+        # Узлы вне новой области больше не обновляются: в покое должны быть
+        # все три слоя, иначе при повороте буферов вернутся старые значения
+        for r0, r1, c0, c1 in box_difference(old, self.active):
+            for layer in (self.eta, self.eta_prev, self.eta_next):
+                layer[r0:r1, c0:c1] = self.rest_level
+
+    def _init_margin(self):
+        """Запас активной области: столько узлов волна проходит за active_every шагов."""
+        if self.active_tol:
+            cells = int(np.ceil(float(np.max(self.c)) * self.dt / self.dx))
+            self.margin = cells * self.active_every
+        else:
+            self.margin = 0
+
+    def checkpoint(self, path):
+        """Сохранить два временных слоя и очередь источников в .npz.
+
+        Файл сначала пишется во временный и затем подменяется, чтобы прерванная
+        запись не испортила предыдущую контрольную точку.
+        """
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, eta=self.eta, eta_prev=self.eta_prev, n=self.n, dt=self.dt,
+                 pending=json.dumps(self.queue.remaining()))
+        os.replace(tmp, path)
+
+    def restore(self, path):
+        """Продолжить расчёт с контрольной точки (после init с теми же параметрами)."""
+        with np.load(path) as data:
+            if data["eta"].shape != self.eta.shape:
+                raise ValueError("Контрольная точка записана для другой сетки!")
+            self.eta[...] = data["eta"]
+            self.eta_prev[...] = data["eta_prev"]
+            self.n = int(data["n"])
+            dt = float(data["dt"])
+            self.queue = SourceQueue(json.loads(str(data["pending"])))
+        if dt != self.dt:
+            # Коэффициент считается в float64 и приводится в конце, как в
+            # build_solver: иначе расчёт во float32 не совпал бы с непрерывным
+            self.dt = dt
+            c = self.speed_multiplier * np.sqrt(self.g * self.D.astype(float))
+            self.coef = ((c * self.dt / self.dx) ** 2).astype(self.dtype)
+        self._init_sponge()
+        self._init_margin()
+        self.eta_next.fill(self.rest_level)
+        ny, nx = self.eta.shape
+        self.active = (0, ny, 0, nx)
+        if self.active_region:
+            self._refresh_active()
+        self.t = self.n * self.dt
+        return self
+
+    def _init_sponge(self):
+        """Множители затухания поглощающего слоя для текущего dt."""
+        self.sponge_strips = []
+        if self.sponge <= 0:
+            return
+        shape = self.c.shape
+        if 2 * (self.sponge + 1) >= min(shape):
+            raise ValueError("Поглощающий слой шире половины сетки!")
+        sigma_max = self.sponge_strength * float(np.max(self.c)) / (self.sponge * self.dx)
+        a = sponge_damping(shape, self.sponge, sigma_max, self.dt)
+        self.sponge_gain = (1 / (1 + a)).astype(self.dtype)
+        self.sponge_blend = (a / (1 + a)).astype(self.dtype)
+        self.sponge_strips = sponge_strips(shape, self.sponge)
+
+    def _inject(self):
+        """Добавить источники, время включения которых наступило."""
+        if not self.queue.ready(self.t):
+            return
+        # Источник стартует с нулевой скоростью
+        q = self.queue
+        for i in q.pop_due(self.t):
+            j0, j1, i0, i1 = stamp_source((self.eta,), self.x, self.y, q.x[i], q.y[i], q.height[i], q.width[i],
+                                          prev=self.eta_prev, coef=self.coef, dx=self.dx)
+            j0, j1, i0, i1 = self._grow((j0, j1, i0, i1))
+            if self.active is None:
+                self.active = (j0, j1, i0, i1)
+            else:
+                r0, r1, c0, c1 = self.active
+                self.active = (min(r0, j0), max(r1, j1), min(c0, i0), max(c1, i1))
+
+
+def build_solver(params, sources, workers=1, cache=default_cache, timer=None, active_region=True,
+                 active_tol=ACTIVE_TOL):
+    """Решатель по параметрам формы (см. DEFAULT_PARAMS).
+
+    Размеры, глубины и высоты умножаются на params["multiplier"], как в m2.py;
+    координаты горы задаются в процентах от L. Для профиля "Из файла" дно
+    читается из params["bathymetry"] (см. bathymetry.load_grid): ячейки
+    размера params["bathymetry_cellsize"] усредняются до шага dx, округлённого
+    до целого числа ячеек (или крупнее, если сетка больше
+    params["bathymetry_max_size"] узлов по стороне), и решатель считает с
+    этим шагом. Суша и ячейки
+    без данных становятся нулевой глубиной, а D0 остаётся уровнем покоя.
+    Источники — в абсолютных координатах. Поля дна берутся из cache (None —
+    всегда считать заново).
+    timer — PhaseTimer для замера времени по этапам; active_region=False —
+    считать схему по всей сетке, active_tol — порог активной области
+    (см. WaveSolver).
+    """
+    p = dict(DEFAULT_PARAMS, **params)
+    multiplier = float(p["multiplier"])
+
+    L = int(p["L"]) * multiplier
+    seabed = {
+        "profile": p["profile"],
+        "L": L,
+        "D0": float(p["D0"]) * multiplier,
+        "hill_height": float(p["hill_height"]) * multiplier,
+        "hill_width": float(p["hill_width"]) * multiplier,
+        "hill_x": L * float(p["hill_x"]) / 100,
+        "hill_y": L * float(p["hill_y"]) / 100,
+        "seed": None if p["seed"] is None else int(p["seed"]),
+        "dx": float(p["dx"]),
+        "speed_multiplier": float(p["speed_multiplier"]),
+        "dt": None if p["dt"] is None else float(p["dt"]),
+        "courant": float(p["courant"]),
+        "order": int(p["order"]),
+        "dtype": np.dtype(p["dtype"]).name,
+    }
+    if p["profile"] == FILE_PROFILE:
+        path = p["bathymetry"]
+        # Файл мог измениться под тем же именем
+        seabed.update(bathymetry=os.path.abspath(path), mtime=os.path.getmtime(path),
+                      window=None if p["bathymetry_window"] is None else [int(v) for v in p["bathymetry_window"]],
+                      cellsize=None if p["bathymetry_cellsize"] is None else float(p["bathymetry_cellsize"]),
+                      max_size=None if p["bathymetry_max_size"] is None else int(p["bathymetry_max_size"]))
+
+    def build():
+        dx = seabed["dx"]
+        if seabed["profile"] == FILE_PROFILE:
+            x, y, D = load_grid(seabed["bathymetry"], dx, seabed["window"], cellsize=seabed["cellsize"],
+                                max_size=seabed["max_size"])
+            D = np.where(np.isfinite(D), np.maximum(D, 0), 0)  # Суша и пропуски — нулевая глубина
+            dx = _grid_step(x)
+        else:
+            x, y = make_grid(L, dx)
+            X, Y = np.meshgrid(x, y)
+            D = depth_profile(X, Y, seabed["profile"], L, seabed["D0"], seabed["hill_height"], seabed["hill_width"],
+                              seabed["hill_x"], seabed["hill_y"], seed=seabed["seed"])
+        c = seabed["speed_multiplier"] * np.sqrt(G * D)
+        dt = seabed["dt"] or stable_dt(c, dx, seabed["courant"], seabed["order"])
+        coef = (c * dt / dx) ** 2
+        # Поля считаются в float64 и хранятся в кэше уже в точности решателя
+        dtype = seabed["dtype"]
+        return {"x": x, "y": y, "D": D.astype(dtype), "c": c.astype(dtype), "coef": coef.astype(dtype),
+                "dt": np.float64(dt)}
+
+    fields = cache.get(seabed, build) if cache is not None else build()
+
+    # Для файла шаг задаёт сетка: dx округляется до целого числа ячеек файла
+    dx = _grid_step(fields["x"]) if p["profile"] == FILE_PROFILE else seabed["dx"]
+    solver = WaveSolver(dx=dx, dt=float(fields["dt"]), speed_multiplier=seabed["speed_multiplier"],
+                        rest_level=seabed["D0"], workers=workers, courant=seabed["courant"], timer=timer,
+                        active_region=active_region, dtype=seabed["dtype"], sponge=int(p["sponge"]),
+                        order=seabed["order"], active_tol=active_tol)
+    return solver.init(fields["D"], sources, fields["x"], fields["y"], c=fields["c"], coef=fields["coef"])
+
+
+def _grid_step(x):
+    """Шаг узлов сетки дна из файла."""
+    return float(x[1] - x[0])
+
+
+def model_extent(params):
+    """Размеры области (Lx, Ly) для параметров формы, без построения дна."""
+    p = dict(DEFAULT_PARAMS, **params)
+    if p["profile"] == FILE_PROFILE:
+        cellsize = None if p["bathymetry_cellsize"] is None else float(p["bathymetry_cellsize"])
+        max_size = None if p["bathymetry_max_size"] is None else int(p["bathymetry_max_size"])
+        return grid_extent(p["bathymetry"], float(p["dx"]), p["bathymetry_window"], cellsize, max_size)
+    L = int(p["L"]) * float(p["multiplier"])
+    return L, L
+
+
+def parse_source(text, L, multiplier=1):
+    """Источник из строки "x%,y%,высота,ширина[,задержка]".
+
+    L — размер области или пара (Lx, Ly) для прямоугольной области.
+    """
+    values = [float(v) for v in text.split(",")]
+    if len(values) not in (4, 5):
+        raise argparse.ArgumentTypeError(f"Ожидалось x,y,h,w[,delay], получено: {text}")
+    x, y, height, width = values[:4]
+    Lx, Ly = L if isinstance(L, tuple) else (L, L)
+    return {
+        "x": x * Lx / 100,
+        "y": y * Ly / 100,
+        "height": height * multiplier,
+        "width": width * multiplier,
+        "delay": values[4] if len(values) == 5 else 0,
+    }
+
+
+def add_model_arguments(parser):
+    """Параметры модели в командной строке (общие для solver.py и export.py)."""
+    parser.add_argument("--profile", default=DEFAULT_PARAMS["profile"], help="Тип профиля глубины")
+    for name in ("L", "D0", "hill_height", "hill_width", "hill_x", "hill_y",
+                 "multiplier", "speed_multiplier", "dx", "dt", "courant"):
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name, type=float, default=DEFAULT_PARAMS[name])
+    parser.add_argument("--bathymetry", help="Файл дна .npy или .asc (профиль \"Из файла\")")
+    parser.add_argument("--bathymetry-window", type=lambda text: [int(v) for v in text.split(",")],
+                        help="Окно файла дна r0,r1,c0,c1 в ячейках")
+    parser.add_argument("--bathymetry-cellsize", type=float,
+                        help="Размер ячейки файла дна (для .asc по умолчанию из заголовка, для .npy 1)")
+    parser.add_argument("--bathymetry-max-size", type=int,
+                        help="Наибольшее число узлов по стороне: файл дна укрупняется сильнее dx")
+    parser.add_argument("--seed", type=int, default=DEFAULT_PARAMS["seed"], help="Зерно для профиля \"Случайный\"")
+    parser.add_argument("--sponge", type=int, default=DEFAULT_PARAMS["sponge"],
+                        help="Ширина поглощающего слоя у краёв в узлах (0 — отражающие края)")
+    parser.add_argument("--order", type=int, default=DEFAULT_PARAMS["order"], choices=[2, 4],
+                        help="Порядок лапласиана по пространству (4 — точнее на крупной сетке)")
+    parser.add_argument("--dtype", default=DEFAULT_PARAMS["dtype"], choices=["float64", "float32"],
+                        help="Точность полей решателя")
+    parser.add_argument("--source", action="append", default=[],
+                        help="Источник x%%,y%%,высота,ширина[,задержка]; можно указать несколько раз")
+    parser.add_argument("--workers", type=int, default=1, help="Число потоков для расчёта схемы")
+    parser.add_argument("--timings", action="store_true", help="Вывести время по этапам расчёта")
+    parser.add_argument("--full-grid", action="store_true", help="Считать схему по всей сетке, а не по активной области")
+    parser.add_argument("--active-tol", type=float, default=ACTIVE_TOL,
+                        help="Порог |eta - D0| активной области (0 — точная область, растёт и не сжимается)")
+    return parser
+
+
+def solver_from_args(args):
+    """Решатель по разобранным аргументам add_model_arguments()."""
+    params = {name: value for name, value in vars(args).items() if name in DEFAULT_PARAMS}
+    if args.bathymetry:
+        params["profile"] = FILE_PROFILE
+    L = model_extent(params)
+    sources = [parse_source(text, L, args.multiplier) for text in args.source]
+    timer = PhaseTimer() if args.timings else None
+    return build_solver(params, sources, workers=args.workers, timer=timer, active_region=not args.full_grid,
+                        active_tol=args.active_tol)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Расчёт волны цунами без графики")
+    parser.add_argument("--steps", type=int, default=1000, help="Количество шагов по времени")
+    add_model_arguments(parser)
+    parser.add_argument("--output", help="Сохранить итоговое поле eta в .npy")
+    parser.add_argument("--snapshots", help="Записывать кадры eta в этот .npy")
+    parser.add_argument("--snapshot-every", type=int, default=10, help="Записывать каждый N-й шаг")
+    parser.add_argument("--checkpoint", help="Файл контрольной точки (.npz)")
+    parser.add_argument("--checkpoint-every", type=int, default=1000, help="Контрольная точка каждые N шагов")
+    parser.add_argument("--resume", action="store_true", help="Продолжить расчёт с контрольной точки")
+    parser.add_argument("--gauge", action="append", default=[],
+                        help="Мареограф x%%,y%%[,имя]; можно указать несколько раз")
+    parser.add_argument("--gauge-every", type=int, default=1, help="Записывать мареографы каждый N-й шаг")
+    parser.add_argument("--gauges-out", default="gauges.csv", help="Файл записи мареографов (.csv или .npy)")
+    args = parser.parse_args(argv)
+
+    solver = solver_from_args(args)
+    if args.resume:
+        solver.restore(args.checkpoint)
+        print(f"Продолжение с шага {solver.n}")
+    store = None
+    if args.snapshots:
+        store = SnapshotStore(args.snapshots, solver, every=args.snapshot_every, resume=args.resume)
+        solver.observers.append(store)
+    if args.checkpoint:
+        solver.observers.append(Checkpointer(args.checkpoint, args.checkpoint_every, store))
+    gauges = None
+    if args.gauge:
+        L = (solver.x[-1], solver.y[-1])
+        points, names = zip(*(parse_gauge(text, L) for text in args.gauge))
+        gauges = GaugeRecorder(solver, points, every=args.gauge_every, names=names)
+        solver.observers.append(gauges)
+
+    steps = max(args.steps - solver.n, 0)
+    start = time.perf_counter()
+    solver.step(steps)
+    elapsed = time.perf_counter() - start
+    solver.close()
+    if store is not None:
+        store.close()
+
+    eta = solver.state
+    print(f"Сетка {eta.shape[1]}x{eta.shape[0]}, шагов {args.steps}, dt = {solver.dt:.4g} с, t = {solver.t:.2f} с")
+    print(f"Время расчёта {elapsed:.3f} с ({steps / max(elapsed, 1e-12):.1f} шаг/с)")
+    print(f"eta: min={eta.min():.4f}, max={eta.max():.4f}")
+    print(f"Активная область: {solver.active_fraction:.1%} сетки")
+    if args.output:
+        np.save(args.output, eta)
+    if gauges is not None:
+        gauges.save(args.gauges_out)
+        print(f"Мареографы записаны в {args.gauges_out}")
+    if solver.timer.enabled:
+        print(solver.timer.summary())
+
+
+if __name__ == "__main__":
+    main()
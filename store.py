@@ -0,0 +1,121 @@
+"""Запись кадров eta на диск и периодические контрольные точки.
+
+Кадры хранятся в обычном .npy, открытом через np.lib.format.open_memmap:
+файл растёт блоками по chunk кадров, а при чтении (open_snapshots) кадры
+отображаются в память без копирования. Рядом лежит <файл>.json с описанием
+записи (шаги, dt, dx, число кадров).
+"""
+import json
+
+import numpy as np
+
+
+def _header_path(path):
+    return path + ".json"
+
+
+class SnapshotStore:
+    """Наблюдатель решателя: сохраняет state на каждом every-м шаге.
+
+    Использование:
+        store = SnapshotStore("run.npy", solver, every=10)
+        solver.observers.append(store)
+        solver.step(1000)
+        store.close()
+    """
+
+    def __init__(self, path, solver, every=1, chunk=64, metadata=None, resume=False):
+        self.path = path
+        self.every = every
+        self.chunk = chunk
+        self.frame_shape = solver.state.shape
+        self.metadata = {
+            "every": every,
+            "dt": solver.dt,
+            "dx": solver.dx,
+            "rest_level": solver.rest_level,
+            "shape": list(self.frame_shape),
+            "dtype": str(solver.state.dtype),
+            **(metadata or {}),
+        }
+
+        if resume:
+            # Кадры после контрольной точки будут посчитаны заново
+            with open(_header_path(path), encoding="utf-8") as f:
+                self.count = min(json.load(f)["count"], solver.n // every + 1)
+            self.frames = np.lib.format.open_memmap(path, mode="r+")
+        else:
+            self.count = 0
+            self.frames = np.lib.format.open_memmap(path, mode="w+", dtype=solver.state.dtype,
+                                                    shape=(chunk,) + self.frame_shape)
+            self.append(solver.state)
+
+    def __call__(self, solver):
+        if solver.n % self.every == 0:
+            self.append(solver.state)
+
+    def append(self, eta):
+        if self.count == len(self.frames):
+            self._resize(self.count + self.chunk)
+        self.frames[self.count] = eta
+        self.count += 1
+
+    def flush(self):
+        """Сбросить кадры на диск и обновить описание записи."""
+        self.frames.flush()
+        with open(_header_path(self.path), "w", encoding="utf-8") as f:
+            json.dump(dict(self.metadata, count=self.count), f, ensure_ascii=False, indent=2)
+
+    def close(self):
+        """Обрезать файл до записанных кадров."""
+        self._resize(self.count)
+        self.flush()
+
+    def _resize(self, length):
+        # Заголовок .npy оставляет место под рост первой оси, поэтому он
+        # переписывается на месте, а файл просто удлиняется или обрезается
+        self.frames.flush()
+        dtype = self.frames.dtype
+        del self.frames
+        with open(self.path, "r+b") as f:
+            np.lib.format.read_magic(f)
+            np.lib.format.read_array_header_1_0(f)
+            offset = f.tell()
+            f.seek(0)
+            np.lib.format.write_array_header_1_0(f, {
+                "descr": np.lib.format.dtype_to_descr(dtype),
+                "fortran_order": False,
+                "shape": (length,) + self.frame_shape,
+            })
+            if f.tell() != offset:
+                raise RuntimeError("Не удалось изменить размер заголовка .npy")
+            f.truncate(offset + length * dtype.itemsize * int(np.prod(self.frame_shape)))
+        self.frames = np.lib.format.open_memmap(self.path, mode="r+")
+
+
+class Checkpointer:
+    """Наблюдатель решателя: контрольная точка на каждом every-м шаге."""
+
+    def __init__(self, path, every=1000, store=None):
+        self.path = path
+        self.every = every
+        self.store = store  # Запись кадров сбрасывается на диск вместе с точкой
+
+    def __call__(self, solver):
+        if solver.n % self.every == 0:
+            if self.store is not None:
+                self.store.flush()
+            solver.checkpoint(self.path)
+
+
+def open_snapshots(path):
+    """Кадры только для чтения (memmap) и описание записи."""
+    with open(_header_path(path), encoding="utf-8") as f:
+        metadata = json.load(f)
+    frames = np.load(path, mmap_mode="r")
+    return frames[:metadata["count"]], metadata
+
+
+def frame_times(metadata):
+    """Моменты времени сохранённых кадров."""
+    return np.arange(metadata["count"]) * metadata["every"] * metadata["dt"]
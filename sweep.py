@@ -0,0 +1,221 @@
+"""Пакетный расчёт серии сценариев на пуле процессов.
+
+Описание серии — JSON-файл:
+
+    {
+        "t_end": 60,
+        "base": {"L": 300, "D0": 20},
+        "grid": {
+            "profile": ["Гора", "Впадина", "Хребет"],
+            "hill_height": [10, 19],
+            "speed_multiplier": [1, 2]
+        },
+        "sources": [["50,50,40,10"], ["30,30,20,10", "70,70,20,10,5"]],
+        "snapshot_every": 50,
+        "gauges": ["90,10,порт", "10,90"]
+    }
+
+Перебираются все сочетания значений из "grid" и наборов источников из
+"sources" (источник задаётся как в solver.py: "x%,y%,высота,ширина[,задержка]").
+Мареографы ("gauges", как --gauge в solver.py) пишутся в gauges.csv сценария.
+"t_end" — модельное время расчёта в секундах: шаг dt выбирается по условию
+Куранта для каждого сценария, поэтому при переборе глубин или скоростей одно
+и то же число шагов "steps" дало бы разное время. "steps" без "t_end" задаёт
+число шагов напрямую (по умолчанию 1000).
+Каждый сценарий пишется в свою папку <out>/<ключ>/; если там уже есть
+summary.json, сценарий пропускается. Ошибка сценария не останавливает серию:
+она записывается в error.json его папки и в столбец "error" таблицы
+summary.csv, а сценарий считается заново при следующем запуске.
+
+    python sweep.py study.json --out results --processes 8
+"""
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from gauges import GaugeRecorder, parse_gauge
+from solver import DEFAULT_PARAMS, build_solver, model_extent, parse_source
+from store import SnapshotStore
+
+
+def expand(spec):
+    """Список сценариев {"params", "sources", "steps" или "t_end", "snapshot_every"} из описания серии."""
+    grid = spec.get("grid", {})
+    names = list(grid)
+    scenarios = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        for sources in spec.get("sources", [[]]):
+            scenario = {
+                "params": dict(spec.get("base", {}), **dict(zip(names, values))),
+                "sources": list(sources),
+                "snapshot_every": spec.get("snapshot_every"),
+            }
+            if "t_end" in spec:
+                scenario["t_end"] = spec["t_end"]
+            else:
+                scenario["steps"] = spec.get("steps", 1000)
+            # Ключ добавляется только при наличии мареографов, чтобы не менять
+            # ключи уже посчитанных серий
+            if spec.get("gauges"):
+                scenario["gauges"] = list(spec["gauges"])
+            scenarios.append(scenario)
+    return scenarios
+
+
+def scenario_key(scenario):
+    """Ключ сценария: хэш параметров после подстановки значений по умолчанию."""
+    full = dict(scenario, params=dict(DEFAULT_PARAMS, **scenario["params"]))
+    text = json.dumps(full, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+class PeakTracker:
+    """Наблюдатель решателя: наибольшее отклонение от уровня покоя за расчёт."""
+
+    def __init__(self):
+        self.peak = 0.0
+
+    def __call__(self, solver):
+        eta = solver.state
+        self.peak = max(self.peak, eta.max() - solver.rest_level, solver.rest_level - eta.min())
+
+
+def run_scenario(scenario, folder):
+    """Посчитать один сценарий и записать summary.json в folder."""
+    os.makedirs(folder, exist_ok=True)
+    error_path = os.path.join(folder, "error.json")
+    if os.path.exists(error_path):
+        os.remove(error_path)  # Ошибка прошлого запуска
+    p = dict(DEFAULT_PARAMS, **scenario["params"])
+    multiplier = float(p["multiplier"])
+    L = model_extent(p)
+    sources = [parse_source(text, L, multiplier) for text in scenario["sources"]]
+
+    solver = build_solver(p, sources)
+    peak = PeakTracker()
+    solver.observers.append(peak)
+    store = None
+    if scenario.get("snapshot_every"):
+        store = SnapshotStore(os.path.join(folder, "snapshots.npy"), solver, every=scenario["snapshot_every"])
+        solver.observers.append(store)
+    gauges = None
+    if scenario.get("gauges"):
+        points, names = zip(*(parse_gauge(text, L) for text in scenario["gauges"]))
+        gauges = GaugeRecorder(solver, points, names=names)
+        solver.observers.append(gauges)
+
+    steps = scenario.get("steps")
+    if steps is None:
+        # Малый допуск: t_end, кратное dt, не должно дать лишний шаг из-за округления
+        steps = math.ceil(float(scenario["t_end"]) / solver.dt - 1e-9)
+    start = time.perf_counter()
+    solver.step(steps)
+    elapsed = time.perf_counter() - start
+    if store is not None:
+        store.close()
+    if gauges is not None:
+        gauges.to_csv(os.path.join(folder, "gauges.csv"))
+
+    eta = solver.state
+    summary = {
+        "scenario": scenario,
+        "grid": list(eta.shape),
+        "dt": solver.dt,
+        "steps": steps,
+        "t": solver.t,
+        "elapsed": elapsed,
+        "eta_min": float(eta.min()),
+        "eta_max": float(eta.max()),
+        "peak_amplitude": float(peak.peak),
+    }
+    # summary.json пишется последним: его наличие означает, что сценарий готов
+    tmp = os.path.join(folder, "summary.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, os.path.join(folder, "summary.json"))
+    return summary
+
+
+def run_sweep(spec, out, processes=None):
+    """Посчитать все сценарии серии, пропуская уже готовые. Возвращает сводки.
+
+    У сценария, завершившегося ошибкой, сводка — {"scenario", "error"}.
+    """
+    todo, summaries = [], {}
+    for scenario in expand(spec):
+        key = scenario_key(scenario)
+        path = os.path.join(out, key, "summary.json")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                summaries[key] = json.load(f)
+        else:
+            todo.append((key, scenario))
+    print(f"Сценариев: {len(todo) + len(summaries)}, готовых: {len(summaries)}")
+
+    with ProcessPoolExecutor(processes) as pool:
+        futures = {pool.submit(run_scenario, scenario, os.path.join(out, key)): (key, scenario)
+                   for key, scenario in todo}
+        for done, future in enumerate(as_completed(futures), 1):
+            key, scenario = futures[future]
+            try:
+                summaries[key] = future.result()
+            except Exception as exc:
+                summaries[key] = _record_error(os.path.join(out, key), scenario, exc)
+                print(f"[{done}/{len(todo)}] {key}: ошибка: {summaries[key]['error']}")
+            else:
+                print(f"[{done}/{len(todo)}] {key}: {summaries[key]['elapsed']:.1f} с")
+
+    _write_table(os.path.join(out, "summary.csv"), summaries)
+    failed = sum("error" in s for s in summaries.values())
+    if failed:
+        print(f"Сценариев с ошибкой: {failed}")
+    if "t_end" not in spec and len({s["t"] for s in summaries.values() if "t" in s}) > 1:
+        print("Сценарии закончились в разное модельное время: dt зависит от параметров, задайте \"t_end\"")
+    return summaries
+
+
+def _record_error(folder, scenario, exc):
+    """Записать ошибку сценария в error.json и вернуть её сводку."""
+    summary = {"scenario": scenario, "error": f"{type(exc).__name__}: {exc}"}
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, "error.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary
+
+
+def _write_table(path, summaries):
+    """Общая таблица по всем сценариям."""
+    param_names = sorted({name for s in summaries.values() for name in s["scenario"]["params"]})
+    metrics = ["steps", "t", "elapsed", "eta_min", "eta_max", "peak_amplitude"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["key"] + param_names + ["sources"] + metrics + ["error"])
+        for key, s in sorted(summaries.items()):
+            params = s["scenario"]["params"]
+            writer.writerow([key] + [params.get(name, "") for name in param_names]
+                            + [";".join(s["scenario"]["sources"])] + [s.get(m, "") for m in metrics] + [s.get("error", "")])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетный расчёт серии сценариев")
+    parser.add_argument("spec", help="JSON-файл с описанием серии")
+    parser.add_argument("--out", default="sweep_results", help="Папка для результатов")
+    parser.add_argument("--processes", type=int, help="Число процессов")
+    args = parser.parse_args(argv)
+
+    with open(args.spec, encoding="utf-8") as f:
+        spec = json.load(f)
+    summaries = run_sweep(spec, args.out, args.processes)
+    if any("error" in s for s in summaries.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()